@@ -1,21 +1,70 @@
-import psycopg2
-import pandas as pd
+import os
+
 import numpy as np
 import streamlit as st
 import matplotlib.pyplot as plt
 import pydeck as pdk
 
-CITY_COORDS = {
-    "Las Vegas":   (36.1699, -115.1398),
-    "Phoenix":     (33.4484, -112.0740),
-    "Charlotte":   (35.2271,  -80.8431),
-    "Pittsburgh":  (40.4406,  -79.9959),
-    "Toronto":     (43.6532,  -79.3832),
-    "Montreal":    (45.5017,  -73.5673),
-    "Cleveland":   (41.4993,  -81.6944),
-    "Madison":     (43.0731,  -89.4012),
-    "Scottsdale":  (33.4942, -111.9261),
-    "Henderson":   (36.0395, -114.9817),
+import snapshot
+import sweep
+from async_queries import run_queries, timings_frame
+from geocode import CITY_COORDS
+from leaderboard import top_restaurants
+from prediction_model import load_models
+from storage import connect, read_sql
+from typed_frames import CLUSTER_SCHEMA, apply_schema, read_typed
+
+MAP_POINT_LIMIT = int(os.environ.get("TIP_MAP_POINT_LIMIT", 1000))
+MAP_CELL_DEG = float(os.environ.get("TIP_MAP_CELL_DEG", 0.002))
+
+HIST_BINS = 20
+PAGE_SIZES = [25, 50, 100]
+
+SORT_COLUMNS = {
+    "Predicted Tip %": "predicted_tip_pct",
+    "Stars": "stars",
+    "Avg Sentiment": "avg_sentiment",
+    "Service Mentions": "service_mentions",
+    "Avg Price": "avg_price",
+    "Name": "name",
+}
+
+OVERVIEW_QUERIES = {
+    "restaurants": "SELECT COUNT(*) FROM restaurants",
+    "reviews": "SELECT COUNT(*) FROM reviews",
+    "tip_range": """
+        SELECT
+            AVG(predicted_tip_pct),
+            MIN(predicted_tip_pct),
+            MAX(predicted_tip_pct)
+        FROM tip_predictions
+    """,
+    "tip_categories": """
+        SELECT tip_category, COUNT(*)
+        FROM tip_predictions
+        GROUP BY tip_category
+    """,
+    "features": """
+        SELECT
+            AVG(avg_sentiment),
+            AVG(service_mentions)
+        FROM restaurant_features
+    """,
+}
+
+VISUALIZATION_QUERIES = {
+    "tips": "SELECT predicted_tip_pct, tip_category FROM tip_predictions",
+    "sentiment": """
+        SELECT f.avg_sentiment, t.predicted_tip_pct, t.tip_category
+        FROM restaurant_features f
+        JOIN tip_predictions t ON f.restaurant_id = t.restaurant_id
+    """,
+    "service": """
+        SELECT f.service_mentions, t.predicted_tip_pct
+        FROM restaurant_features f
+        JOIN tip_predictions t ON f.restaurant_id = t.restaurant_id
+        WHERE f.service_mentions <= 20
+    """,
 }
 
 CLUSTER_COLORS = {
@@ -32,69 +81,65 @@ def categorize_tip(tip):
     else:
         return "high"
 
-def run_query(query, params=None):
+def run_query(query, params=None, schema=None):
+    if schema is not None:
+        return read_typed(query, schema, params=params)
+
     conn = connect()
-    df = pd.read_sql(query, conn, params=params)
+    df = read_sql(query, conn, params=params)
     conn.close()
     return df
 
 def compute_clusters():
-    df = run_query("""
-        SELECT 
-            r.restaurant_id,
-            r.name,
-            r.city,
-            r.stars,
-            f.avg_sentiment,
-            f.avg_price,
-            t.predicted_tip_pct
-        FROM restaurants r
-        JOIN restaurant_features f ON f.restaurant_id = r.restaurant_id
-        JOIN tip_predictions t ON t.restaurant_id = r.restaurant_id
-    """)
+    df = snapshot.load_frame(columns=[
+        "restaurant_id", "name", "city", "stars", "lat", "lon",
+        "avg_sentiment", "avg_price", "predicted_tip_pct",
+    ])
+    if df is None:
+        df = run_query("""
+            SELECT 
+                r.restaurant_id,
+                r.name,
+                r.city,
+                r.stars,
+                r.lat,
+                r.lon,
+                f.avg_sentiment,
+                f.avg_price,
+                t.predicted_tip_pct
+            FROM restaurants r
+            JOIN restaurant_features f ON f.restaurant_id = r.restaurant_id
+            JOIN tip_predictions t ON t.restaurant_id = r.restaurant_id
+        """, schema=CLUSTER_SCHEMA)
+    else:
+        df = apply_schema(df, CLUSTER_SCHEMA)
     X = df[["stars", "avg_sentiment", "avg_price", "predicted_tip_pct"]].fillna(0.0)
 
+    return assign_clusters(df)
+
+def assign_clusters(df):
     df["cluster"] = np.random.randint(0, 3, size=len(df))
     return df
 
+def show_timings(timings):
+    with st.expander("Query timings"):
+        st.dataframe(timings_frame(timings), hide_index=True)
+        st.caption(f"{len(timings) - 1} queries ran concurrently in {timings['total'] * 1000:.1f} ms")
+
 def overview_page():
     st.header("Overview & Summary Statistics")
 
-    conn = connect()
-    cur = conn.cursor()
-
-    cur.execute("SELECT COUNT(*) FROM restaurants")
-    total_restaurants = cur.fetchone()[0]
-
-    cur.execute("SELECT COUNT(*) FROM reviews")
-    total_reviews = cur.fetchone()[0]
-
-    cur.execute("""
-        SELECT 
-            AVG(predicted_tip_pct),
-            MIN(predicted_tip_pct),
-            MAX(predicted_tip_pct)
-        FROM tip_predictions
-    """)
-    avg_tip, min_tip, max_tip = cur.fetchone()
-
-    cur.execute("""
-        SELECT tip_category, COUNT(*) 
-        FROM tip_predictions 
-        GROUP BY tip_category
-    """)
-    cat_rows = cur.fetchall()
+    try:
+        results, timings = run_queries(OVERVIEW_QUERIES)
+    except TimeoutError as e:
+        st.error(f"Overview data is unavailable: {e}")
+        return
 
-    cur.execute("""
-        SELECT 
-            AVG(avg_sentiment),
-            AVG(service_mentions)
-        FROM restaurant_features
-    """)
-    avg_sent, avg_service = cur.fetchone()
-
-    cur.close()
-    conn.close()
+    total_restaurants = results["restaurants"].iloc[0, 0]
+    total_reviews = results["reviews"].iloc[0, 0]
+    avg_tip, min_tip, max_tip = results["tip_range"].iloc[0]
+    cat_rows = list(results["tip_categories"].itertuples(index=False, name=None))
+    avg_sent, avg_service = results["features"].iloc[0]
 
     col1, col2, col3 = st.columns(3)
     col1.metric("Total Restaurants", f"{total_restaurants:,}")
@@ -112,26 +157,169 @@ def overview_page():
     st.write(f"- **Avg sentiment:** {avg_sent:.3f}")
     st.write(f"- **Avg service mentions:** {avg_service:.1f}")
 
+    show_timings(timings)
+
 def simulate_tip(stars, sentiment, service_mentions, avg_price):
-    tip = 13.5
-    tip += sentiment * 4.0
-    tip += (stars - 3.0) * 1.0
-    tip += min(service_mentions, 6) * 0.2
+    return float(sweep.heuristic_tip(stars, sentiment, service_mentions, avg_price))
+
+CITY_FROM = """
+    FROM restaurants r
+    JOIN restaurant_features f ON r.restaurant_id = f.restaurant_id
+    JOIN tip_predictions t ON r.restaurant_id = t.restaurant_id
+    WHERE r.city = %s
+"""
+
+def city_names():
+    return run_query("SELECT DISTINCT city FROM restaurants ORDER BY city")["city"].tolist()
+
+def city_summary(city):
+    # The snapshot keeps one record batch per city, so this reads only the
+    # selected city's rows; the query below is the fallback when it is stale.
+    df = snapshot.load_frame(city=city, columns=["stars", "avg_sentiment", "predicted_tip_pct"])
+    if df is not None:
+        tips = df["predicted_tip_pct"]
+        to_float = lambda v: 0.0 if np.isnan(v) else float(v)
+        return {
+            "count": len(df),
+            "avg_stars": to_float(df["stars"].mean()),
+            "avg_sentiment": to_float(df["avg_sentiment"].mean()),
+            "avg_tip": to_float(tips.mean()),
+            "min_tip": to_float(tips.min()),
+            "max_tip": to_float(tips.max()),
+        }
+
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT
+            COUNT(*),
+            AVG(r.stars),
+            AVG(f.avg_sentiment),
+            AVG(t.predicted_tip_pct),
+            MIN(t.predicted_tip_pct),
+            MAX(t.predicted_tip_pct)
+    """ + CITY_FROM, (city,))
+    count, avg_stars, avg_sent, avg_tip, min_tip, max_tip = cur.fetchone()
+    cur.close()
+    conn.close()
+
+    to_float = lambda v: float(v) if v is not None else 0.0
+    return {
+        "count": count,
+        "avg_stars": to_float(avg_stars),
+        "avg_sentiment": to_float(avg_sent),
+        "avg_tip": to_float(avg_tip),
+        "min_tip": to_float(min_tip),
+        "max_tip": to_float(max_tip),
+    }
+
+def city_histogram(city, lo, hi, bins=HIST_BINS):
+    # Same buckets as width_bucket(lo, hi, bins), with the maximum folded into
+    # the last bin; written with FLOOR so it also runs on DuckDB.
+    width = (hi - lo) / bins if hi > lo else 1.0
+    edges = lo + width * np.arange(bins + 1)
+
+    df = snapshot.load_frame(city=city, columns=["predicted_tip_pct"])
+    if df is not None:
+        tips = df["predicted_tip_pct"].dropna().to_numpy(dtype=float)
+        buckets = np.minimum(np.floor((tips - lo) / width).astype(int), bins - 1)
+        return edges, np.bincount(buckets, minlength=bins)
+
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT
+            LEAST(CAST(FLOOR((t.predicted_tip_pct - %s) / %s) AS INT), %s) AS bucket,
+            COUNT(*)
+    """ + CITY_FROM + """
+        GROUP BY bucket
+    """, (lo, width, bins - 1, city))
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+
+    counts = np.zeros(bins, dtype=int)
+    for bucket, n in rows:
+        counts[int(bucket)] = n
+    return edges, counts
+
+def city_page(city, sort_label, descending, page_size, after=None):
+    col = SORT_COLUMNS[sort_label]
+    op, order = ("<", "DESC") if descending else (">", "ASC")
+
+    # restaurant_listing (migration 007) holds the joined columns with a
+    # (city, column, restaurant_id) index per sort column. The cursor is a
+    # row comparison so PostgreSQL can start the index scan at it and stop
+    # after one page.
+    query = """
+        SELECT
+            restaurant_id,
+            name,
+            stars,
+            avg_sentiment,
+            service_mentions,
+            avg_price,
+            predicted_tip_pct,
+            tip_category
+        FROM restaurant_listing
+        WHERE city = %s
+    """
+    params = [city]
+
+    if after is not None:
+        query += f" AND ({col}, restaurant_id) {op} (%s, %s)"
+        params += [after[0], after[1]]
+
+    query += f" ORDER BY {col} {order}, restaurant_id {order} LIMIT %s"
+    params.append(page_size + 1)
+
+    df = run_query(query, tuple(params))
+    return df.head(page_size), len(df) > page_size
+
+def page_cursor(page, sort_label):
+    last = page.iloc[-1]
+    value = last[SORT_COLUMNS[sort_label]]
+    if hasattr(value, "item"):
+        value = value.item()
+    return value, last["restaurant_id"]
+
+def city_points(city):
+    # One row per restaurant for the scatter map, fetched for this city only:
+    # the city's record batch from the snapshot, or the query when it is stale.
+    df = snapshot.load_frame(city=city, columns=["name", "stars", "predicted_tip_pct", "lat", "lon"])
+    if df is None:
+        df = run_query("""
+            SELECT r.name, r.stars, t.predicted_tip_pct, r.lat, r.lon
+        """ + CITY_FROM + """
+            AND r.lat IS NOT NULL
+        """, (city,), schema=CLUSTER_SCHEMA)
+    else:
+        df = apply_schema(df[df["lat"].notna()].reset_index(drop=True), CLUSTER_SCHEMA)
+    return assign_clusters(df)
 
-    if avg_price > 25:
-        tip += 0.6
-    if avg_price < 10:
-        tip -= 0.6
+def map_grid(city, cell_deg=MAP_CELL_DEG):
+    df = run_query("""
+        SELECT
+            FLOOR(r.lat / %s) AS cell_y,
+            FLOOR(r.lon / %s) AS cell_x,
+            COUNT(*) AS restaurants,
+            AVG(t.predicted_tip_pct) AS avg_tip
+        FROM restaurants r
+        JOIN tip_predictions t ON r.restaurant_id = t.restaurant_id
+        WHERE r.city = %s AND r.lat IS NOT NULL
+        GROUP BY cell_y, cell_x
+    """, (cell_deg, cell_deg, city))
 
-    tip += np.random.normal(0, 0.5)
-    tip = max(10, min(tip, 22))
-    return tip
+    df["lat"] = (df["cell_y"].astype(float) + 0.5) * cell_deg
+    df["lon"] = (df["cell_x"].astype(float) + 0.5) * cell_deg
+    df["restaurants"] = df["restaurants"].astype(int)
+    df["avg_tip"] = df["avg_tip"].astype(float)
+    return df[["lat", "lon", "restaurants", "avg_tip"]]
 
 def explore_by_city_page():
     st.header("Explore Restaurants by City")
 
-    cities_df = run_query("SELECT DISTINCT city FROM restaurants ORDER BY city")
-    cities = cities_df["city"].tolist()
+    cities = city_names()
 
     if not cities:
         st.warning("No cities found.")
@@ -139,35 +327,54 @@ def explore_by_city_page():
 
     city = st.selectbox("Choose a city", cities)
 
-    df = run_query("""
-        SELECT 
-            r.restaurant_id,
-            r.name,
-            r.stars,
-            r.city,
-            f.avg_sentiment,
-            f.service_mentions,
-            f.avg_price,
-            t.predicted_tip_pct,
-            t.tip_category
-        FROM restaurants r
-        JOIN restaurant_features f ON r.restaurant_id = f.restaurant_id
-        JOIN tip_predictions t ON r.restaurant_id = t.restaurant_id
-        WHERE r.city = %s
-        ORDER BY t.predicted_tip_pct DESC
-    """, (city,))
+    summary = city_summary(city)
+    if summary["count"] == 0:
+        st.warning("No scored restaurants in this city.")
+        return
 
-    st.write(f"Found **{len(df)}** restaurants in **{city}**.")
-    st.dataframe(df)
+    st.write(f"Found **{summary['count']}** restaurants in **{city}**.")
+
+    col1, col2, col3, col4 = st.columns(4)
+    sort_label = col1.selectbox("Sort by", list(SORT_COLUMNS), key="city_sort")
+    direction = col2.selectbox("Order", ["Descending", "Ascending"], key="city_order")
+    page_size = col3.selectbox("Rows per page", PAGE_SIZES, key="city_page_size")
+    descending = direction == "Descending"
+
+    # Keyset pagination: each page is fetched with the last row of the previous
+    # page as its cursor, so the cost depends on the page size only.
+    state_key = (city, sort_label, descending, page_size)
+    if st.session_state.get("city_page_key") != state_key:
+        st.session_state["city_page_key"] = state_key
+        st.session_state["city_page_cursors"] = [None]
+    cursors = st.session_state["city_page_cursors"]
+
+    page, has_next = city_page(city, sort_label, descending, page_size, after=cursors[-1])
+    col4.write(f"Page {len(cursors)}")
+    st.dataframe(page, hide_index=True)
+
+    nav1, nav2, _ = st.columns([1, 1, 6])
+    nav1.button("Previous", key="city_prev", disabled=len(cursors) == 1,
+                on_click=cursors.pop)
+    if has_next:
+        nav2.button("Next", key="city_next", on_click=cursors.append,
+                    args=(page_cursor(page, sort_label),))
+    else:
+        nav2.button("Next", key="city_next", disabled=True)
 
     col1, col2, col3 = st.columns(3)
-    col1.metric("Avg Stars", f"{df['stars'].mean():.2f}")
-    col2.metric("Avg Sentiment", f"{df['avg_sentiment'].mean():.3f}")
-    col3.metric("Avg Predicted Tip %", f"{df['predicted_tip_pct'].mean():.2f}")
+    col1.metric("Avg Stars", f"{summary['avg_stars']:.2f}")
+    col2.metric("Avg Sentiment", f"{summary['avg_sentiment']:.3f}")
+    col3.metric("Avg Predicted Tip %", f"{summary['avg_tip']:.2f}")
+
+    st.subheader(f"Top 10 for Tips in {city}")
+    top = top_restaurants("city", city, 10)
+    st.dataframe(top[["rank", "name", "stars", "predicted_tip_pct", "tip_category"]],
+                 hide_index=True)
 
     st.subheader("Tip Distribution")
+    edges, counts = city_histogram(city, summary["min_tip"], summary["max_tip"])
     fig, ax = plt.subplots()
-    ax.hist(df["predicted_tip_pct"], bins=20)
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge")
     ax.set_xlabel("Predicted Tip %")
     st.pyplot(fig)
 
@@ -177,49 +384,102 @@ def explore_by_city_page():
         st.info("Add city coordinates to CITY_COORDS dictionary.")
         return
 
-    all_clusters = compute_clusters()
-    city_df = all_clusters[all_clusters["city"] == city].copy()
-
-    if city_df.empty:
-        st.warning("No cluster data for this city.")
-        return
-
     center_lat, center_lon = CITY_COORDS[city]
 
-    n = len(city_df)
-    city_df["lat"] = center_lat + np.random.normal(0, 0.01, n)
-    city_df["lon"] = center_lon + np.random.normal(0, 0.01, n)
-    city_df["color"] = city_df["cluster"].map(CLUSTER_COLORS)
-
     view_state = pdk.ViewState(
         latitude=center_lat,
         longitude=center_lon,
         zoom=13
     )
 
-    layer = pdk.Layer(
-        "ScatterplotLayer",
-        data=city_df,
-        get_position='[lon, lat]',
-        get_fill_color='color',
-        get_radius=15,
-        pickable=True,
-    )
+    point_limit = st.number_input("Aggregate the map above this many restaurants",
+                                  min_value=1, value=MAP_POINT_LIMIT, step=100,
+                                  key="map_point_limit")
+
+    if summary["count"] > point_limit:
+        cells = map_grid(city)
+        if cells.empty:
+            st.warning("No restaurant coordinates for this city. Run geocode.py.")
+            return
+
+        style = st.radio("Map layer", ["Hexagon", "Heatmap"], horizontal=True, key="map_layer")
+        st.caption(f"{summary['count']:,} restaurants aggregated into {len(cells):,} grid cells.")
+
+        if style == "Hexagon":
+            layer = pdk.Layer(
+                "HexagonLayer",
+                data=cells,
+                get_position='[lon, lat]',
+                get_elevation_weight='restaurants',
+                get_color_weight='restaurants',
+                elevation_aggregation='SUM',
+                color_aggregation='SUM',
+                radius=MAP_CELL_DEG * 111000,
+                elevation_scale=4,
+                extruded=True,
+                pickable=True,
+            )
+            tooltip = {"text": "Restaurants: {elevationValue}"}
+        else:
+            layer = pdk.Layer(
+                "HeatmapLayer",
+                data=cells,
+                get_position='[lon, lat]',
+                get_weight='restaurants',
+            )
+            tooltip = None
+    else:
+        city_df = city_points(city)
+
+        if city_df.empty:
+            st.warning("No cluster data for this city.")
+            return
+
+        city_df["color"] = city_df["cluster"].map(CLUSTER_COLORS)
+
+        layer = pdk.Layer(
+            "ScatterplotLayer",
+            data=city_df,
+            get_position='[lon, lat]',
+            get_fill_color='color',
+            get_radius=15,
+            pickable=True,
+        )
+        tooltip = {"text": "{name}\nStars: {stars}\nTip: {predicted_tip_pct}%\nCluster: {cluster}"}
 
     deck = pdk.Deck(
         initial_view_state=view_state,
         layers=[layer],
-        tooltip={"text": "{name}\nStars: {stars}\nTip: {predicted_tip_pct}%\nCluster: {cluster}"}
+        tooltip=tooltip
     )
 
     st.pydeck_chart(deck)
 
+def visualization_frames():
+    df_snapshot = snapshot.load_frame(columns=[
+        "avg_sentiment", "service_mentions", "predicted_tip_pct", "tip_category",
+    ])
+
+    if df_snapshot is not None:
+        df_tips = df_snapshot[["predicted_tip_pct", "tip_category"]]
+        df_sent = df_snapshot[["avg_sentiment", "predicted_tip_pct", "tip_category"]]
+        df_service = df_snapshot.loc[df_snapshot["service_mentions"] <= 20,
+                                     ["service_mentions", "predicted_tip_pct"]]
+        return df_tips, df_sent, df_service, None
+
+    results, timings = run_queries(VISUALIZATION_QUERIES)
+    return results["tips"], results["sentiment"], results["service"], timings
+
 def visualizations_page():
     st.header("Visualizations")
 
     st.subheader("Distribution of Predicted Tips & Categories")
 
-    df_tips = run_query("SELECT predicted_tip_pct, tip_category FROM tip_predictions")
+    try:
+        df_tips, df_sent, df_service, timings = visualization_frames()
+    except TimeoutError as e:
+        st.error(f"Visualization data is unavailable: {e}")
+        return
 
     col1, col2 = st.columns(2)
     with col1:
@@ -235,12 +495,6 @@ def visualizations_page():
 
     st.subheader("Sentiment vs Tips")
 
-    df_sent = run_query("""
-        SELECT f.avg_sentiment, t.predicted_tip_pct, t.tip_category
-        FROM restaurant_features f
-        JOIN tip_predictions t ON f.restaurant_id = t.restaurant_id
-    """)
-
     fig, ax = plt.subplots()
     colors = {"low": "red", "medium": "orange", "high": "green"}
 
@@ -262,19 +516,25 @@ def visualizations_page():
 
     st.subheader("Impact of Service Mentions")
 
-    df_service = run_query("""
-        SELECT f.service_mentions, t.predicted_tip_pct
-        FROM restaurant_features f
-        JOIN tip_predictions t ON f.restaurant_id = t.restaurant_id
-        WHERE f.service_mentions <= 20
-    """)
-
     grouped = df_service.groupby("service_mentions")["predicted_tip_pct"].mean()
 
     fig, ax = plt.subplots()
     ax.bar(grouped.index, grouped.values)
     st.pyplot(fig)
 
+    if timings is not None:
+        show_timings(timings)
+
+@st.cache_resource
+def tip_models(version):
+    return load_models() if version else None
+
+@st.cache_data
+def tip_surface(x_name, y_name, fixed, version):
+    # Keyed on the model version and the inputs that are not swept, so moving
+    # the two swept sliders only moves the marker.
+    return sweep.sweep(x_name, y_name, fixed, tip_models(version))
+
 def simulator_page():
     st.header("What-If Tip Simulator")
 
@@ -286,20 +546,50 @@ def simulator_page():
         service_mentions = st.slider("Service Mentions", 0, 20, 3)
         avg_price = st.slider("Average Price", 5.0, 40.0, 18.0, 1.0)
 
+    values = {
+        "stars": stars,
+        "sentiment": sentiment,
+        "service_mentions": service_mentions,
+        "avg_price": avg_price,
+    }
+
+    version = sweep.model_version()
+    use_model = version is not None and st.toggle("Use trained model", value=True,
+                                                  key="sim_use_model")
+    if not use_model:
+        version = None
+
     with col2:
-        tip = simulate_tip(stars, sentiment, service_mentions, avg_price)
+        if use_model:
+            tip = sweep.predict_one(values, tip_models(version))
+        else:
+            tip = simulate_tip(stars, sentiment, service_mentions, avg_price)
         category = categorize_tip(tip)
 
         st.metric("Predicted Tip %", f"{tip:.2f}%")
         st.write(f"**Category:** {category.upper()}")
+        st.caption("Trained model" if use_model else "Heuristic estimate")
 
-def connect():
-    return psycopg2.connect(
-        dbname="restaurant_tips",
-        user="postgres",
-        password="your_password",
-        host="localhost"
-    )
+    st.subheader("Tip Surface")
+    labels = {name: spec[0] for name, spec in sweep.INPUTS.items()}
+    names = {label: name for name, label in labels.items()}
+    ax1, ax2 = st.columns(2)
+    x_name = names[ax1.selectbox("X axis", list(names), index=0, key="sim_x")]
+    y_options = [label for label, name in names.items() if name != x_name]
+    y_name = names[ax2.selectbox("Y axis", y_options, key="sim_y")]
+
+    fixed = {name: v for name, v in values.items() if name not in (x_name, y_name)}
+    xs, ys, surface = tip_surface(x_name, y_name, fixed, version)
+
+    fig, ax = plt.subplots()
+    mesh = ax.pcolormesh(xs, ys, surface, shading="nearest", cmap="viridis")
+    fig.colorbar(mesh, ax=ax, label="Predicted Tip %")
+    ax.scatter([values[x_name]], [values[y_name]], marker="X", s=120,
+               color="white", edgecolors="black", label="Current inputs")
+    ax.set_xlabel(labels[x_name])
+    ax.set_ylabel(labels[y_name])
+    ax.legend(loc="upper left")
+    st.pyplot(fig)
 
 def main():
     st.set_page_config(page_title="Restaurant Tip Prediction Explorer", layout="wide")
@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import atexit
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from storage import connect, get_backend, postgres_params, read_sql
+
+QUERY_TIMEOUT = float(os.environ.get("TIP_QUERY_TIMEOUT", 10))
+POOL_MIN_SIZE = int(os.environ.get("TIP_POOL_MIN_SIZE", 2))
+POOL_MAX_SIZE = int(os.environ.get("TIP_POOL_MAX_SIZE", 8))
+
+_state = {"loop": None, "pool": None, "executor": None}
+_lock = threading.Lock()
+
+def _conninfo():
+    from psycopg.conninfo import make_conninfo
+
+    return make_conninfo(
+        **postgres_params(),
+        options=f"-c statement_timeout={int(QUERY_TIMEOUT * 1000)}",
+    )
+
+def _event_loop():
+    # Streamlit runs pages synchronously, so the pool lives on its own event
+    # loop in a daemon thread and pages hand coroutines over to it.
+    with _lock:
+        if _state["loop"] is None:
+            if sys.platform == "win32":
+                loop = asyncio.SelectorEventLoop()
+            else:
+                loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="async-queries", daemon=True).start()
+            _state["loop"] = loop
+        return _state["loop"]
+
+async def _open_pool():
+    from psycopg_pool import AsyncConnectionPool
+
+    if _state["pool"] is None:
+        pool = AsyncConnectionPool(_conninfo(), min_size=POOL_MIN_SIZE,
+                                   max_size=POOL_MAX_SIZE, open=False)
+        await pool.open()
+        _state["pool"] = pool
+        atexit.register(_close_pool)
+    return _state["pool"]
+
+def _close_pool():
+    # Closing on the pool's own loop stops its worker tasks cleanly instead
+    # of leaving them pending when the interpreter exits.
+    pool, loop = _state["pool"], _state["loop"]
+    if pool is not None and loop.is_running():
+        asyncio.run_coroutine_threadsafe(pool.close(), loop).result(timeout=5)
+        _state["pool"] = None
+
+async def _fetch_postgres(name, query, params, timeout):
+    pool = await _open_pool()
+    start = time.perf_counter()
+
+    async def fetch():
+        async with pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(query, params)
+                rows = await cur.fetchall()
+                columns = [col.name for col in cur.description]
+        # Like read_sql, turn NUMERIC columns into floats rather than Decimal.
+        return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+    try:
+        df = await asyncio.wait_for(fetch(), timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"Query {name!r} exceeded {timeout:g}s") from None
+    return df, time.perf_counter() - start
+
+async def _gather_postgres(queries, timeout):
+    tasks = [_fetch_postgres(name, query, params, timeout)
+             for name, (query, params) in queries.items()]
+    return await asyncio.gather(*tasks)
+
+def _run_postgres(queries, timeout):
+    future = asyncio.run_coroutine_threadsafe(_gather_postgres(queries, timeout), _event_loop())
+    return dict(zip(queries, future.result()))
+
+def _fetch_duckdb(query, params, conns):
+    start = time.perf_counter()
+    conn = connect()
+    conns.append(conn)
+    try:
+        df = read_sql(query, conn, params=params)
+    finally:
+        conn.close()
+    return df, time.perf_counter() - start
+
+def _run_duckdb(queries, timeout):
+    # DuckDB has no async driver; each query gets its own cursor on a worker
+    # thread, and queries still running at the deadline are interrupted.
+    with _lock:
+        if _state["executor"] is None:
+            _state["executor"] = ThreadPoolExecutor(max_workers=POOL_MAX_SIZE,
+                                                    thread_name_prefix="async-queries")
+        executor = _state["executor"]
+
+    conns = {name: [] for name in queries}
+    futures = {name: executor.submit(_fetch_duckdb, query, params, conns[name])
+               for name, (query, params) in queries.items()}
+    done, pending = wait(futures.values(), timeout=timeout)
+
+    if pending:
+        late = [name for name, future in futures.items() if future in pending]
+        for name in late:
+            for conn in conns[name]:
+                conn._con.interrupt()
+        raise TimeoutError(f"Query {late[0]!r} exceeded {timeout:g}s")
+    return {name: future.result() for name, future in futures.items()}
+
+def run_queries(queries, timeout=None):
+    # queries maps a name to (sql, params). Returns the DataFrames by name and
+    # the latency of each query in seconds, plus "total" for the whole batch.
+    timeout = QUERY_TIMEOUT if timeout is None else timeout
+    queries = {name: (q, None) if isinstance(q, str) else q for name, q in queries.items()}
+
+    start = time.perf_counter()
+    if get_backend().name == "postgres":
+        fetched = _run_postgres(queries, timeout)
+    else:
+        fetched = _run_duckdb(queries, timeout)
+
+    results = {name: df for name, (df, _) in fetched.items()}
+    timings = {name: elapsed for name, (_, elapsed) in fetched.items()}
+    timings["total"] = time.perf_counter() - start
+    return results, timings
+
+def run_queries_serial(queries):
+    timings = {}
+    results = {}
+    start = time.perf_counter()
+    for name, q in queries.items():
+        query, params = (q, None) if isinstance(q, str) else q
+        query_start = time.perf_counter()
+        conn = connect()
+        results[name] = read_sql(query, conn, params=params)
+        conn.close()
+        timings[name] = time.perf_counter() - query_start
+    timings["total"] = time.perf_counter() - start
+    return results, timings
+
+def timings_frame(timings):
+    rows = [(name, elapsed * 1000) for name, elapsed in timings.items() if name != "total"]
+    df = pd.DataFrame(rows, columns=["query", "latency_ms"])
+    return df.sort_values("latency_ms", ascending=False).reset_index(drop=True)
+
+def report(label, timings):
+    print(f"\n{label}")
+    for name, ms in timings_frame(timings).itertuples(index=False):
+        print(f"  {name:<20} {ms:8.1f} ms")
+    print(f"  {'total':<20} {timings['total'] * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    from app import OVERVIEW_QUERIES, VISUALIZATION_QUERIES
+
+    parser = argparse.ArgumentParser(description="Compare serial and concurrent page queries")
+    parser.add_argument("--page", choices=["overview", "visualizations"], default="overview")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=QUERY_TIMEOUT)
+    args = parser.parse_args()
+
+    queries = OVERVIEW_QUERIES if args.page == "overview" else VISUALIZATION_QUERIES
+    print(f"Backend: {get_backend().name}, page: {args.page}, {len(queries)} queries")
+
+    run_queries(queries, timeout=args.timeout)
+    serial, concurrent = [], []
+    for _ in range(args.repeat):
+        serial.append(run_queries_serial(queries)[1])
+        concurrent.append(run_queries(queries, timeout=args.timeout)[1])
+
+    best_serial = min(serial, key=lambda t: t["total"])
+    best_concurrent = min(concurrent, key=lambda t: t["total"])
+    report("Serial (best run)", best_serial)
+    report("Concurrent (best run)", best_concurrent)
+    slowest = max(v for k, v in best_concurrent.items() if k != "total")
+    print(f"\nSpeedup: {best_serial['total'] / best_concurrent['total']:.2f}x "
+          f"(slowest single query {slowest * 1000:.1f} ms)")
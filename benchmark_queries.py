@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import statistics
+import time
+
+from storage import connect, get_backend
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+REPEAT = 5
+
+# Read queries issued by the app and the pipeline. Parameters are filled in
+# from sample_params() so the plans use real values from the database.
+QUERIES = {
+    "app.overview.restaurant_count": ("SELECT COUNT(*) FROM restaurants", None),
+    "app.overview.review_count": ("SELECT COUNT(*) FROM reviews", None),
+    "app.overview.tip_range": ("""
+        SELECT AVG(predicted_tip_pct), MIN(predicted_tip_pct), MAX(predicted_tip_pct)
+        FROM tip_predictions
+    """, None),
+    "app.overview.categories": ("""
+        SELECT tip_category, COUNT(*) FROM tip_predictions GROUP BY tip_category
+    """, None),
+    "app.overview.feature_means": ("""
+        SELECT AVG(avg_sentiment), AVG(service_mentions) FROM restaurant_features
+    """, None),
+    "app.city.list": ("SELECT DISTINCT city FROM restaurants ORDER BY city", None),
+    "app.city.summary": ("""
+        SELECT COUNT(*), AVG(r.stars), AVG(f.avg_sentiment), AVG(t.predicted_tip_pct),
+               MIN(t.predicted_tip_pct), MAX(t.predicted_tip_pct)
+        FROM restaurants r
+        JOIN restaurant_features f ON r.restaurant_id = f.restaurant_id
+        JOIN tip_predictions t ON r.restaurant_id = t.restaurant_id
+        WHERE r.city = %(city)s
+    """, ("city",)),
+    "app.city.histogram": ("""
+        SELECT LEAST(CAST(FLOOR((t.predicted_tip_pct - 8) / 1.1) AS INT), 19) AS bucket, COUNT(*)
+        FROM restaurants r
+        JOIN restaurant_features f ON r.restaurant_id = f.restaurant_id
+        JOIN tip_predictions t ON r.restaurant_id = t.restaurant_id
+        WHERE r.city = %(city)s
+        GROUP BY bucket
+    """, ("city",)),
+    "app.city.page": ("""
+        SELECT restaurant_id, name, stars, avg_sentiment, service_mentions,
+               avg_price, predicted_tip_pct, tip_category
+        FROM restaurant_listing
+        WHERE city = %(city)s
+        ORDER BY predicted_tip_pct DESC, restaurant_id DESC
+        LIMIT 26
+    """, ("city",)),
+    "app.clusters": ("""
+        SELECT r.restaurant_id, r.name, r.city, r.stars, f.avg_sentiment,
+               f.avg_price, t.predicted_tip_pct
+        FROM restaurants r
+        JOIN restaurant_features f ON f.restaurant_id = r.restaurant_id
+        JOIN tip_predictions t ON t.restaurant_id = r.restaurant_id
+    """, None),
+    "app.viz.tips": ("SELECT predicted_tip_pct, tip_category FROM tip_predictions", None),
+    "app.viz.sentiment": ("""
+        SELECT f.avg_sentiment, t.predicted_tip_pct, t.tip_category
+        FROM restaurant_features f
+        JOIN tip_predictions t ON f.restaurant_id = t.restaurant_id
+    """, None),
+    "app.viz.service": ("""
+        SELECT f.service_mentions, t.predicted_tip_pct
+        FROM restaurant_features f
+        JOIN tip_predictions t ON f.restaurant_id = t.restaurant_id
+        WHERE f.service_mentions <= 20
+    """, None),
+    "pipeline.sentiment.reviews": ("""
+        SELECT review_text, stars FROM reviews WHERE restaurant_id = %(restaurant_id)s
+    """, ("restaurant_id",)),
+    "pipeline.sentiment.avg_price": ("""
+        SELECT AVG(price) FROM menu_items WHERE restaurant_id = %(restaurant_id)s
+    """, ("restaurant_id",)),
+    "pipeline.sentiment.top": ("""
+        SELECT r.name, r.city, f.avg_sentiment, f.service_mentions
+        FROM restaurants r
+        JOIN restaurant_features f ON r.restaurant_id = f.restaurant_id
+        ORDER BY f.avg_sentiment DESC
+        LIMIT 10
+    """, None),
+    "pipeline.model.get_data": ("""
+        SELECT r.restaurant_id, r.stars, r.price_range, f.avg_sentiment,
+               f.positive_reviews, f.service_mentions, f.avg_price
+        FROM restaurants r
+        JOIN restaurant_features f ON r.restaurant_id = f.restaurant_id
+    """, None),
+    "pipeline.model.show_top": ("""
+        SELECT r.name, r.city, r.stars, t.predicted_tip_pct
+        FROM restaurants r
+        JOIN tip_predictions t ON r.restaurant_id = t.restaurant_id
+        WHERE t.tip_category = 'high'
+        ORDER BY t.predicted_tip_pct DESC
+        LIMIT 10
+    """, None),
+}
+
+def sample_params(cur):
+    params = {"city": None, "restaurant_id": None}
+    try:
+        cur.execute("SELECT city, COUNT(*) FROM restaurants GROUP BY city ORDER BY 2 DESC LIMIT 1")
+        row = cur.fetchone()
+        if row:
+            params["city"] = row[0]
+        cur.execute("SELECT restaurant_id FROM restaurants ORDER BY review_count DESC NULLS LAST LIMIT 1")
+        row = cur.fetchone()
+        if row:
+            params["restaurant_id"] = row[0]
+    except Exception:
+        cur.connection.rollback()
+    return params
+
+def node_types(plan):
+    types = [plan["Node Type"]]
+    for child in plan.get("Plans", []):
+        types.extend(node_types(child))
+    return types
+
+def explain(cur, query, params):
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+    result = cur.fetchone()[0]
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]
+
+def time_query(cur, query, params):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        cur.execute(query, params)
+        cur.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def benchmark_query(cur, query, params):
+    plan = explain(cur, query, params)
+
+    return {
+        "planning_ms": plan.get("Planning Time"),
+        "execution_ms": plan.get("Execution Time"),
+        "latency_ms": time_query(cur, query, params),
+        "nodes": node_types(plan["Plan"]),
+        "plan": plan["Plan"],
+    }
+
+def run_benchmark(label):
+    if get_backend().name != "postgres":
+        raise SystemExit("EXPLAIN ANALYZE plans are only captured for the postgres backend; "
+                         "use --backends to compare latencies across backends")
+
+    conn = connect()
+    conn.autocommit = True
+    cur = conn.cursor()
+
+    params = sample_params(cur)
+    results = {}
+
+    print(f"\nBenchmarking queries ({label})...")
+    for name, (query, needs) in QUERIES.items():
+        query_params = {key: params[key] for key in (needs or ())}
+        if any(value is None for value in query_params.values()):
+            results[name] = {"error": "no sample data"}
+            continue
+        try:
+            results[name] = benchmark_query(cur, query, query_params or None)
+        except Exception as e:
+            results[name] = {"error": str(e).strip()}
+            continue
+        r = results[name]
+        print(f"  {name}: {r['latency_ms']:.2f} ms ({r['nodes'][0]})")
+
+    cur.close()
+    conn.close()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"query_plans_{label}.json")
+    with open(path, "w") as f:
+        json.dump({"label": label, "params": params, "results": results}, f, indent=2, default=str)
+    print(f"Saved: {path}")
+
+    return results
+
+def load_results(label):
+    with open(os.path.join(RESULTS_DIR, f"query_plans_{label}.json")) as f:
+        return json.load(f)["results"]
+
+def compare(before, after):
+    print("\n")
+    print(f"{'query':<34} {'before ms':>10} {'after ms':>10} {'speedup':>8}  plan")
+    for name in QUERIES:
+        b, a = before.get(name, {}), after.get(name, {})
+        if "latency_ms" not in b or "latency_ms" not in a:
+            print(f"{name:<34} {'-':>10} {'-':>10} {'-':>8}  {a.get('error', b.get('error', ''))}")
+            continue
+        speedup = b["latency_ms"] / a["latency_ms"] if a["latency_ms"] else float("inf")
+        scans = sorted({n for n in a["nodes"] if "Scan" in n})
+        print(f"{name:<34} {b['latency_ms']:>10.2f} {a['latency_ms']:>10.2f} {speedup:>7.1f}x  {', '.join(scans)}")
+
+def compare_backends(backends=("postgres", "duckdb")):
+    latencies = {}
+    for backend in backends:
+        conn = connect(backend)
+        conn.autocommit = True
+        cur = conn.cursor()
+        params = sample_params(cur)
+        latencies[backend] = {}
+
+        print(f"\nTiming queries on {backend}...")
+        for name, (query, needs) in QUERIES.items():
+            query_params = {key: params[key] for key in (needs or ())}
+            try:
+                latencies[backend][name] = time_query(cur, query, query_params or None)
+            except Exception as e:
+                print(f"  {name}: {str(e).strip()}")
+
+        cur.close()
+        conn.close()
+
+    print("\n")
+    print(f"{'query':<34} " + " ".join(f"{b + ' ms':>12}" for b in backends))
+    for name in QUERIES:
+        cells = []
+        for backend in backends:
+            value = latencies[backend].get(name)
+            cells.append(f"{value:>12.2f}" if value is not None else f"{'-':>12}")
+        print(f"{name:<34} " + " ".join(cells))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, "backend_latency.json")
+    with open(path, "w") as f:
+        json.dump(latencies, f, indent=2)
+    print(f"Saved: {path}")
+
+    return latencies
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE the app and pipeline queries")
+    parser.add_argument("label", nargs="?", default="current",
+                        help="name for this run, e.g. before or after")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="compare two saved runs instead of benchmarking")
+    parser.add_argument("--backends", nargs="*", metavar="BACKEND",
+                        help="time the same queries on several backends "
+                        "(default: postgres duckdb)")
+    args = parser.parse_args()
+
+    if args.backends is not None:
+        compare_backends(args.backends or ("postgres", "duckdb"))
+    elif args.compare:
+        compare(load_results(args.compare[0]), load_results(args.compare[1]))
+    else:
+        run_benchmark(args.label)
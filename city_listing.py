@@ -0,0 +1,48 @@
+import argparse
+
+from storage import connect
+
+COLUMNS = ["restaurant_id", "city", "name", "stars", "avg_sentiment", "service_mentions",
+           "avg_price", "predicted_tip_pct", "tip_category"]
+
+# An upsert rather than delete-and-insert, so ingest workers re-scoring the
+# same restaurant at once do not collide on the primary key.
+UPSERT_QUERY = f"""
+    INSERT INTO restaurant_listing ({", ".join(COLUMNS)})
+    SELECT r.restaurant_id, r.city, r.name, r.stars, f.avg_sentiment, f.service_mentions,
+           f.avg_price, t.predicted_tip_pct, t.tip_category
+    FROM restaurants r
+    JOIN restaurant_features f ON f.restaurant_id = r.restaurant_id
+    JOIN tip_predictions t ON t.restaurant_id = r.restaurant_id
+    {{where}}
+    ON CONFLICT (restaurant_id) DO UPDATE
+    SET {", ".join(f"{c} = EXCLUDED.{c}" for c in COLUMNS[1:])}
+"""
+
+def refresh_listing(restaurant_ids=None):
+    # Without ids every scored restaurant is rewritten and rows whose
+    # prediction is gone are removed; with ids only those rows are upserted.
+    conn = connect()
+    cur = conn.cursor()
+
+    if restaurant_ids is None:
+        cur.execute(UPSERT_QUERY.format(where=""))
+        cur.execute("""
+            DELETE FROM restaurant_listing
+            WHERE restaurant_id NOT IN (SELECT restaurant_id FROM tip_predictions)
+        """)
+        cur.execute("SELECT COUNT(*) FROM restaurant_listing")
+        print(f"Refreshed restaurant listing ({cur.fetchone()[0]:,} rows)")
+    elif restaurant_ids:
+        placeholders = ", ".join(["%s"] * len(restaurant_ids))
+        cur.execute(UPSERT_QUERY.format(where=f"WHERE r.restaurant_id IN ({placeholders})"),
+                    list(restaurant_ids))
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the per-city restaurant listing")
+    parser.parse_args()
+    refresh_listing()
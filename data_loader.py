@@ -1,15 +1,8 @@
-import psycopg2
 from datasets import load_dataset
 import random
 
-def connect():
-    conn = psycopg2.connect(
-        dbname="restaurant_tips",
-        user="postgres",
-        password="your_password",
-        host="localhost"
-    )
-    return conn
+from geocode import assign_coordinates
+from storage import connect
 
 def load_yelp_data():
     print("Loading Yelp dataset from Hugging Face...")
@@ -63,7 +56,7 @@ def load_yelp_data():
             INSERT INTO reviews 
             (review_id, restaurant_id, stars, review_text, review_date)
             VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (review_id) DO NOTHING
+            ON CONFLICT DO NOTHING
         """, (
             review_id,
             business_id,
@@ -120,16 +113,19 @@ def load_yelp_data():
     cur.close()
     conn.close()
     
+    print("Assigning map coordinates...")
+    assign_coordinates()
+    
     print("\n")
     print("Data Loading Complete")
-    print(“\n”)
+    print("\n")
     print(f"Restaurants: {restaurant_count:,}")
     print(f"Reviews: {review_count:,}")
     print(f"Menu items: {menu_count:,}")
 
 if __name__ == "__main__":
-    print("\n”)
+    print("\n")
     print("Yelp Data Loader")
-    print("\n”)
+    print("\n")
     load_yelp_data()
 
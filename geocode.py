@@ -0,0 +1,62 @@
+import hashlib
+import math
+
+from storage import connect
+
+CITY_COORDS = {
+    "Las Vegas":   (36.1699, -115.1398),
+    "Phoenix":     (33.4484, -112.0740),
+    "Charlotte":   (35.2271,  -80.8431),
+    "Pittsburgh":  (40.4406,  -79.9959),
+    "Toronto":     (43.6532,  -79.3832),
+    "Montreal":    (45.5017,  -73.5673),
+    "Cleveland":   (41.4993,  -81.6944),
+    "Madison":     (43.0731,  -89.4012),
+    "Scottsdale":  (33.4942, -111.9261),
+    "Henderson":   (36.0395, -114.9817),
+}
+
+SPREAD = 0.01
+
+def restaurant_coordinates(restaurant_id, city):
+    if city not in CITY_COORDS:
+        return None
+
+    # The dataset has no addresses, so restaurants are placed around the city
+    # centre. Seeding from the id keeps each one in the same spot on every run.
+    digest = hashlib.sha256(restaurant_id.encode("utf-8")).digest()
+    u1 = (int.from_bytes(digest[:8], "big") + 1) / 2.0 ** 64
+    u2 = int.from_bytes(digest[8:16], "big") / 2.0 ** 64
+    radius = math.sqrt(-2.0 * math.log(u1))
+
+    center_lat, center_lon = CITY_COORDS[city]
+    lat = center_lat + SPREAD * radius * math.cos(2 * math.pi * u2)
+    lon = center_lon + SPREAD * radius * math.sin(2 * math.pi * u2)
+    return lat, lon
+
+def assign_coordinates():
+    conn = connect()
+    cur = conn.cursor()
+
+    cur.execute("SELECT restaurant_id, city FROM restaurants WHERE lat IS NULL")
+    rows = cur.fetchall()
+
+    updates = []
+    for rest_id, city in rows:
+        coords = restaurant_coordinates(rest_id, city)
+        if coords:
+            updates.append((coords[0], coords[1], rest_id))
+
+    if updates:
+        cur.executemany("UPDATE restaurants SET lat = %s, lon = %s WHERE restaurant_id = %s", updates)
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    print(f"Assigned coordinates to {len(updates):,} restaurants")
+    return len(updates)
+
+if __name__ == "__main__":
+    print("Geocoding restaurants")
+    assign_coordinates()
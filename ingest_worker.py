@@ -0,0 +1,256 @@
+import argparse
+import datetime
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+from city_listing import refresh_listing
+from leaderboard import update_restaurants
+from prediction_model import (FEATURES, MODEL_PATH, get_data, load_models, save_predictions,
+                              with_model_features)
+from sentiment_analysis import add_reviews
+from snapshot import publish_snapshot
+from storage import connect
+
+INGEST_DIR = os.environ.get("TIP_INGEST_DIR", "ingest")
+METRICS_PATH = os.environ.get("TIP_INGEST_METRICS", "ingest_metrics.jsonl")
+BATCH_SIZE = int(os.environ.get("TIP_INGEST_BATCH_SIZE", 500))
+POLL_INTERVAL = float(os.environ.get("TIP_INGEST_POLL", 2.0))
+
+_models = {"mtime": None, "models": None}
+
+def current_models():
+    # Picks up a retrained model file without restarting the worker.
+    mtime = os.path.getmtime(MODEL_PATH) if os.path.exists(MODEL_PATH) else None
+    if mtime != _models["mtime"]:
+        _models.update(mtime=mtime, models=load_models())
+        if _models["models"] is None:
+            print(f"No saved models at {MODEL_PATH}; run prediction_model.py to enable re-scoring")
+    return _models["models"]
+
+def pending_files(directory):
+    # Writers should create files under another name and rename them to
+    # *.jsonl when complete, so a half-written file is never picked up.
+    paths = [os.path.join(directory, name) for name in os.listdir(directory)
+             if name.endswith(".jsonl")]
+    return sorted(paths, key=os.path.getmtime)
+
+def read_records(path):
+    arrived = os.path.getmtime(path)
+    records = []
+    bad = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+                records.append((
+                    str(rec["review_id"]),
+                    str(rec["restaurant_id"]),
+                    int(rec["stars"]),
+                    rec.get("text") or rec.get("review_text") or "",
+                    rec.get("review_date") or datetime.date.today().isoformat(),
+                    float(rec.get("created_at", arrived)),
+                ))
+            except (ValueError, KeyError, TypeError):
+                bad += 1
+    return records, bad
+
+def insert_batch(cur, records):
+    rest_ids = sorted({r[1] for r in records})
+    cur.execute(f"""
+        SELECT restaurant_id FROM restaurants
+        WHERE restaurant_id IN ({", ".join(["%s"] * len(rest_ids))})
+    """, rest_ids)
+    known = {row[0] for row in cur.fetchall()}
+
+    review_ids = [r[0] for r in records]
+    cur.execute(f"""
+        SELECT review_id FROM reviews
+        WHERE review_id IN ({", ".join(["%s"] * len(review_ids))})
+    """, review_ids)
+    seen = {row[0] for row in cur.fetchall()}
+
+    new = []
+    unknown = 0
+    duplicates = []
+    for rec in records:
+        if rec[1] not in known:
+            unknown += 1
+        elif rec[0] in seen:
+            duplicates.append(rec)
+        else:
+            seen.add(rec[0])
+            new.append(rec)
+
+    if new:
+        cur.executemany("""
+            INSERT INTO reviews
+            (review_id, restaurant_id, stars, review_text, review_date)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT DO NOTHING
+        """, [rec[:5] for rec in new])
+    return new, unknown, duplicates
+
+def process_batch(records):
+    start = time.time()
+
+    # Reviews and the features derived from them commit together, so a
+    # replayed file only ever adds the reviews that are not stored yet.
+    conn = connect()
+    cur = conn.cursor()
+    try:
+        new, unknown, duplicates = insert_batch(cur, records)
+        inserted_at = time.time()
+        affected = add_reviews(cur, [(rec[1], rec[3], rec[2]) for rec in new])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+    features_at = time.time()
+
+    # Re-scoring runs after the commit, so a batch whose re-score failed is
+    # already stored when its file is replayed. Restaurants of duplicate
+    # records are re-scored too, which brings their predictions up to date.
+    # Restaurants with new reviews get their text embeddings re-projected, and
+    # the snapshot is republished so the app does not fall back to SQL.
+    rescore = sorted(set(affected) | {rec[1] for rec in duplicates})
+
+    rescored = 0
+    models = current_models()
+    if rescore and models is not None:
+        features = models.get('features', FEATURES)
+        df = with_model_features(get_data(rescore), features, models.get('text_build'),
+                                 refresh=affected)
+        save_predictions(df, models['regressor'], models['classifier'], None, features)
+        update_restaurants(rescore)
+        refresh_listing(rescore)
+        rescored = len(df)
+    if rescore:
+        publish_snapshot()
+    done = time.time()
+
+    latencies = [done - rec[5] for rec in new]
+    return {
+        "at": done,
+        "rows": len(records),
+        "inserted": len(new),
+        "unknown_restaurant": unknown,
+        "duplicates": len(duplicates),
+        "restaurants": len(affected),
+        "rescored": rescored,
+        "insert_s": round(inserted_at - start, 4),
+        "features_s": round(features_at - inserted_at, 4),
+        "predict_s": round(done - features_at, 4),
+        "batch_s": round(done - start, 4),
+        "rows_per_s": round(len(new) / max(done - start, 1e-9), 1),
+        "latency_p50_s": round(float(np.percentile(latencies, 50)), 4) if latencies else None,
+        "latency_max_s": round(max(latencies), 4) if latencies else None,
+    }
+
+def write_metrics(metrics):
+    with open(METRICS_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(metrics) + "\n")
+
+def move_file(path, subdir):
+    target_dir = os.path.join(os.path.dirname(path), subdir)
+    os.makedirs(target_dir, exist_ok=True)
+    os.replace(path, os.path.join(target_dir, os.path.basename(path)))
+
+def process_file(path, batch_size=BATCH_SIZE):
+    records, bad = read_records(path)
+    if bad:
+        print(f"  {os.path.basename(path)}: skipped {bad} malformed lines")
+
+    totals = {"inserted": 0, "rows": 0}
+    try:
+        for i in range(0, len(records), batch_size):
+            metrics = process_batch(records[i:i + batch_size])
+            metrics["file"] = os.path.basename(path)
+            write_metrics(metrics)
+            totals["inserted"] += metrics["inserted"]
+            totals["rows"] += metrics["rows"]
+            latency = metrics["latency_p50_s"]
+            print(f"  {metrics['file']}: {metrics['inserted']}/{metrics['rows']} new reviews, "
+                  f"{metrics['rescored']} restaurants re-scored in {metrics['batch_s'] * 1000:.0f} ms"
+                  + (f" (p50 ingest-to-prediction {latency:.2f}s)" if latency is not None else ""))
+    except Exception as e:
+        print(f"  {os.path.basename(path)} failed: {e}")
+        move_file(path, "failed")
+        return totals
+
+    move_file(path, "processed")
+    return totals
+
+def run(directory=INGEST_DIR, batch_size=BATCH_SIZE, poll=POLL_INTERVAL, once=False):
+    os.makedirs(directory, exist_ok=True)
+    print(f"Watching {directory} for *.jsonl review files (batch size {batch_size})")
+    current_models()
+
+    start = time.time()
+    inserted = 0
+    try:
+        while True:
+            files = pending_files(directory)
+            for path in files:
+                inserted += process_file(path, batch_size)["inserted"]
+            if once and not files:
+                break
+            if not files:
+                time.sleep(poll)
+    except KeyboardInterrupt:
+        pass
+
+    elapsed = time.time() - start
+    print(f"Ingested {inserted:,} reviews in {elapsed:.1f}s ({inserted / max(elapsed, 1e-9):,.0f} reviews/s)")
+    return inserted
+
+def write_demo_file(n, directory=INGEST_DIR):
+    # Writes n reviews for existing restaurants (plus a few unknown ones) as
+    # a drop file, reusing stored review texts.
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT restaurant_id FROM restaurants")
+    rest_ids = [row[0] for row in cur.fetchall()]
+    cur.execute("SELECT review_text FROM reviews LIMIT 1000")
+    texts = [row[0] for row in cur.fetchall()]
+    cur.close()
+    conn.close()
+
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime("%Y%m%d%H%M%S")
+    path = os.path.join(directory, f"reviews_{stamp}.jsonl")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        for i in range(n):
+            rest_id = random.choice(rest_ids) if random.random() > 0.01 else "business_unknown"
+            f.write(json.dumps({
+                "review_id": f"ingest_{stamp}_{i}",
+                "restaurant_id": rest_id,
+                "stars": random.randint(1, 5),
+                "text": random.choice(texts),
+                "created_at": time.time(),
+            }) + "\n")
+    os.replace(path + ".tmp", path)
+    print(f"Wrote {n:,} reviews to {path}")
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest review files from a drop directory")
+    parser.add_argument("--dir", default=INGEST_DIR, help="drop directory to watch")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL, help="seconds between directory scans")
+    parser.add_argument("--once", action="store_true", help="process waiting files and exit")
+    parser.add_argument("--demo", type=int, metavar="N", help="write a drop file of N sample reviews first")
+    args = parser.parse_args()
+
+    if args.demo:
+        write_demo_file(args.demo, args.dir)
+    run(args.dir, args.batch_size, args.poll, args.once)
@@ -0,0 +1,303 @@
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from sentiment_analysis import FEATURES_UPSERT, compute_features
+from storage import connect, get_backend
+
+JOB_BATCH_SIZE = int(os.environ.get("TIP_JOB_BATCH_SIZE", 50))
+LEASE_SECONDS = float(os.environ.get("TIP_JOB_LEASE_SECONDS", 60))
+HEARTBEAT_SECONDS = float(os.environ.get("TIP_JOB_HEARTBEAT_SECONDS", 10))
+MAX_ATTEMPTS = int(os.environ.get("TIP_JOB_MAX_ATTEMPTS", 3))
+POLL_SECONDS = float(os.environ.get("TIP_JOB_POLL_SECONDS", 2))
+
+def require_postgres():
+    if get_backend().name != "postgres":
+        raise RuntimeError("The job queue needs PostgreSQL (FOR UPDATE SKIP LOCKED); "
+                           "on DuckDB run sentiment_analysis.py instead")
+
+def enqueue(batch_size=JOB_BATCH_SIZE, run_id=None):
+    require_postgres()
+    run_id = run_id or time.strftime("run_%Y%m%d_%H%M%S")
+
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT restaurant_id FROM restaurants ORDER BY restaurant_id")
+    ids = [row[0] for row in cur.fetchall()]
+
+    batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+    cur.executemany("""
+        INSERT INTO feature_jobs (run_id, restaurant_ids)
+        VALUES (%s, %s)
+    """, [(run_id, batch) for batch in batches])
+
+    conn.commit()
+    cur.close()
+    conn.close()
+    print(f"Queued {len(batches)} jobs ({len(ids):,} restaurants) as {run_id}")
+    return run_id
+
+def reclaim_stale(cur, max_attempts=MAX_ATTEMPTS):
+    # A running job whose lease ran out belongs to a worker that crashed or
+    # stalled; put it back in the queue, or give up after max_attempts.
+    cur.execute("""
+        UPDATE feature_jobs
+        SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+            error = 'lease expired (worker ' || COALESCE(worker_id, '?') || ')'
+        WHERE status = 'running' AND lease_expires_at < now()
+    """, (max_attempts,))
+    return cur.rowcount
+
+def claim(cur, worker_id, run_id=None, lease_seconds=LEASE_SECONDS):
+    cur.execute("""
+        UPDATE feature_jobs
+        SET status = 'running',
+            worker_id = %s,
+            attempts = attempts + 1,
+            started_at = now(),
+            heartbeat_at = now(),
+            lease_expires_at = now() + %s * interval '1 second',
+            restaurants_done = 0
+        WHERE job_id = (
+            SELECT job_id FROM feature_jobs
+            WHERE status = 'pending' AND (%s IS NULL OR run_id = %s)
+            ORDER BY job_id
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING job_id, restaurant_ids
+    """, (worker_id, lease_seconds, run_id, run_id))
+    return cur.fetchone()
+
+class Heartbeat(threading.Thread):
+    # Extends the lease of the current job on its own connection, so a long
+    # job is not reclaimed while it is still making progress.
+    def __init__(self, job_id, worker_id, progress):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.progress = progress
+        self.stopped = threading.Event()
+        self.lost = threading.Event()
+
+    def run(self):
+        conn = connect()
+        conn.autocommit = True
+        cur = conn.cursor()
+        while not self.stopped.wait(HEARTBEAT_SECONDS):
+            cur.execute("""
+                UPDATE feature_jobs
+                SET heartbeat_at = now(),
+                    lease_expires_at = now() + %s * interval '1 second',
+                    restaurants_done = %s
+                WHERE job_id = %s AND worker_id = %s AND status = 'running'
+            """, (LEASE_SECONDS, self.progress[0], self.job_id, self.worker_id))
+            if cur.rowcount == 0:
+                self.lost.set()
+                break
+        cur.close()
+        conn.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+def process_job(job_id, restaurant_ids, worker_id):
+    progress = [0]
+    heartbeat = Heartbeat(job_id, worker_id, progress)
+    heartbeat.start()
+
+    # All features for the job commit together with the job's completion, so
+    # a reclaimed job is simply redone.
+    conn = connect()
+    cur = conn.cursor()
+    try:
+        # A stalled worker (paused, or stuck outside the database) would keep
+        # its uncommitted feature rows locked after its lease ran out, and the
+        # worker that reclaimed the job would block on them; the server ends
+        # such a transaction once it has been idle for a whole lease.
+        cur.execute("SELECT set_config('idle_in_transaction_session_timeout', %s, false)",
+                    (str(int(LEASE_SECONDS * 1000)),))
+        for rest_id in restaurant_ids:
+            if heartbeat.lost.is_set():
+                raise RuntimeError("lease lost")
+            features = compute_features(cur, rest_id)
+            if features is not None:
+                cur.execute(FEATURES_UPSERT, (rest_id, *features))
+            progress[0] += 1
+
+        # now() is the start of this transaction, i.e. of the job; the
+        # finish time needs the wall clock.
+        cur.execute("""
+            UPDATE feature_jobs
+            SET status = 'done', finished_at = clock_timestamp(), restaurants_done = %s, error = NULL
+            WHERE job_id = %s AND worker_id = %s AND status = 'running'
+        """, (progress[0], job_id, worker_id))
+        if cur.rowcount == 0:
+            raise RuntimeError("lease lost")
+        conn.commit()
+    except Exception as e:
+        print(f"  [{worker_id}] job {job_id} failed: {e}")
+        try:
+            conn.rollback()
+            cur.execute("""
+                UPDATE feature_jobs
+                SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                    error = %s
+                WHERE job_id = %s AND worker_id = %s AND status = 'running'
+            """, (MAX_ATTEMPTS, str(e)[:500], job_id, worker_id))
+            conn.commit()
+        except Exception:
+            # The server already closed the connection; the lease expires
+            # and reclaim_stale requeues the job.
+            pass
+        return 0
+    finally:
+        heartbeat.stop()
+        if not conn.closed:
+            cur.close()
+            conn.close()
+
+    return progress[0]
+
+def run_worker(worker_id=None, run_id=None, exit_when_idle=True):
+    require_postgres()
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    print(f"[{worker_id}] started")
+
+    conn = connect()
+    cur = conn.cursor()
+    jobs = 0
+    restaurants = 0
+    start = time.time()
+    try:
+        while True:
+            reclaim_stale(cur)
+            job = claim(cur, worker_id, run_id)
+            conn.commit()
+
+            if job is None:
+                if exit_when_idle:
+                    break
+                time.sleep(POLL_SECONDS)
+                continue
+
+            job_id, restaurant_ids = job
+            restaurants += process_job(job_id, restaurant_ids, worker_id)
+            jobs += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cur.close()
+        conn.close()
+
+    elapsed = time.time() - start
+    print(f"[{worker_id}] {jobs} jobs, {restaurants:,} restaurants, "
+          f"{restaurants / max(elapsed, 1e-9):.1f} restaurants/s")
+    return restaurants
+
+def progress_report(cur, run_id):
+    cur.execute("""
+        SELECT status, COUNT(*), COALESCE(SUM(cardinality(restaurant_ids)), 0)
+        FROM feature_jobs WHERE run_id = %s
+        GROUP BY status
+    """, (run_id,))
+    by_status = {status: (jobs, rests) for status, jobs, rests in cur.fetchall()}
+
+    cur.execute("""
+        SELECT worker_id,
+               COUNT(*) FILTER (WHERE status = 'done'),
+               SUM(CASE WHEN status = 'done' THEN restaurants_done ELSE 0 END),
+               EXTRACT(EPOCH FROM MAX(COALESCE(finished_at, heartbeat_at)) - MIN(started_at))
+        FROM feature_jobs
+        WHERE run_id = %s AND worker_id IS NOT NULL
+        GROUP BY worker_id
+        ORDER BY worker_id
+    """, (run_id,))
+    workers = cur.fetchall()
+    return by_status, workers
+
+def coordinate(run_id, interval=5.0):
+    require_postgres()
+    conn = connect()
+    cur = conn.cursor()
+    start = time.time()
+
+    while True:
+        reclaimed = reclaim_stale(cur)
+        conn.commit()
+        by_status, workers = progress_report(cur, run_id)
+        conn.commit()
+
+        total = sum(rests for _, rests in by_status.values())
+        done = by_status.get("done", (0, 0))[1]
+        open_jobs = sum(by_status.get(s, (0, 0))[0] for s in ("pending", "running"))
+        elapsed = time.time() - start
+
+        print(f"\n[{run_id}] {done:,}/{total:,} restaurants ({done / max(total, 1):.0%}) "
+              f"in {elapsed:.0f}s, {done / max(elapsed, 1e-9):.1f} restaurants/s"
+              + (f", reclaimed {reclaimed} stale jobs" if reclaimed else ""))
+        print("  jobs: " + ", ".join(f"{s} {by_status.get(s, (0, 0))[0]}"
+                                     for s in ("pending", "running", "done", "failed")))
+        for worker_id, jobs_done, rests, span in workers:
+            rate = (rests or 0) / float(span) if span else 0.0
+            print(f"  {worker_id:<30} {jobs_done:4d} jobs {rests or 0:7,} restaurants {rate:8.1f}/s")
+
+        if open_jobs == 0:
+            break
+        time.sleep(interval)
+
+    cur.close()
+    conn.close()
+    return time.time() - start
+
+def demo(worker_counts, batch_size=JOB_BATCH_SIZE):
+    # One run per worker count against the same database, each with its own
+    # local worker processes, to show how throughput scales.
+    results = []
+    for n in worker_counts:
+        run_id = enqueue(batch_size, run_id=time.strftime(f"demo_{n}w_%H%M%S"))
+        start = time.time()
+        procs = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker",
+                                   "--run", run_id, "--worker-id", f"{socket.gethostname()}:w{i}"])
+                 for i in range(n)]
+        coordinate(run_id, interval=2.0)
+        for proc in procs:
+            proc.wait()
+        results.append((n, time.time() - start))
+
+    print("\nWorkers   Seconds   Speedup")
+    for n, seconds in results:
+        print(f"{n:7d} {seconds:9.1f} {results[0][1] / seconds:8.2f}x")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentiment processing through a PostgreSQL job queue")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--enqueue", action="store_true", help="queue every restaurant in batches")
+    mode.add_argument("--worker", action="store_true", help="claim and process jobs")
+    mode.add_argument("--coordinator", metavar="RUN_ID", help="report progress for a run")
+    mode.add_argument("--demo", type=int, nargs="+", metavar="N",
+                      help="run the whole queue with N local workers, e.g. --demo 1 2 4")
+    parser.add_argument("--batch-size", type=int, default=JOB_BATCH_SIZE, help="restaurants per job")
+    parser.add_argument("--run", help="only claim jobs from this run")
+    parser.add_argument("--worker-id", help="defaults to host:pid")
+    parser.add_argument("--wait", action="store_true", help="keep polling when the queue is empty")
+    args = parser.parse_args()
+
+    try:
+        if args.enqueue:
+            enqueue(args.batch_size)
+        elif args.worker:
+            run_worker(args.worker_id, args.run, exit_when_idle=not args.wait)
+        elif args.coordinator:
+            coordinate(args.coordinator)
+        else:
+            demo(args.demo, args.batch_size)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
@@ -0,0 +1,240 @@
+import argparse
+import os
+
+import pandas as pd
+
+from storage import connect, get_backend, read_sql
+
+TOP_K = int(os.environ.get("TIP_LEADERBOARD_K", 50))
+
+COLUMNS = ["restaurant_id", "name", "city", "stars", "predicted_tip_pct", "tip_category"]
+
+# Ties are broken by restaurant_id so the bulk and incremental paths agree on
+# the order.
+RANKED_QUERY = """
+    SELECT scope, scope_key, rank, restaurant_id, name, city, stars,
+           predicted_tip_pct, tip_category
+    FROM (
+        SELECT 'global' AS scope, '' AS scope_key,
+               ROW_NUMBER() OVER (ORDER BY t.predicted_tip_pct DESC, r.restaurant_id) AS rank,
+               r.restaurant_id, r.name, r.city, r.stars, t.predicted_tip_pct, t.tip_category
+        FROM tip_predictions t
+        JOIN restaurants r ON r.restaurant_id = t.restaurant_id
+        UNION ALL
+        SELECT 'city', r.city,
+               ROW_NUMBER() OVER (PARTITION BY r.city
+                                  ORDER BY t.predicted_tip_pct DESC, r.restaurant_id),
+               r.restaurant_id, r.name, r.city, r.stars, t.predicted_tip_pct, t.tip_category
+        FROM tip_predictions t
+        JOIN restaurants r ON r.restaurant_id = t.restaurant_id
+        WHERE r.city IS NOT NULL
+        UNION ALL
+        SELECT 'category', t.tip_category,
+               ROW_NUMBER() OVER (PARTITION BY t.tip_category
+                                  ORDER BY t.predicted_tip_pct DESC, r.restaurant_id),
+               r.restaurant_id, r.name, r.city, r.stars, t.predicted_tip_pct, t.tip_category
+        FROM tip_predictions t
+        JOIN restaurants r ON r.restaurant_id = t.restaurant_id
+        WHERE t.tip_category IS NOT NULL
+    ) ranked
+    WHERE rank <= %s
+"""
+
+SCOPE_FILTERS = {
+    "global": "",
+    "city": "WHERE r.city = %s",
+    "category": "WHERE t.tip_category = %s",
+}
+
+INSERT_ROW = """
+    INSERT INTO tip_leaderboard
+        (scope, scope_key, rank, restaurant_id, name, city, stars,
+         predicted_tip_pct, tip_category)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+UPSERT_ROW = INSERT_ROW + """
+    ON CONFLICT (scope, scope_key, rank) DO UPDATE
+    SET restaurant_id = EXCLUDED.restaurant_id,
+        name = EXCLUDED.name,
+        city = EXCLUDED.city,
+        stars = EXCLUDED.stars,
+        predicted_tip_pct = EXCLUDED.predicted_tip_pct,
+        tip_category = EXCLUDED.tip_category,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+def refresh_leaderboards(k=TOP_K):
+    conn = connect()
+    cur = conn.cursor()
+
+    cur.execute("DELETE FROM tip_leaderboard")
+    cur.execute(f"""
+        INSERT INTO tip_leaderboard
+            (scope, scope_key, rank, restaurant_id, name, city, stars,
+             predicted_tip_pct, tip_category)
+        {RANKED_QUERY}
+    """, (k,))
+    cur.execute("SELECT COUNT(*), COUNT(DISTINCT scope || ':' || scope_key) FROM tip_leaderboard")
+    rows, boards = cur.fetchone()
+
+    conn.commit()
+    cur.close()
+    conn.close()
+    print(f"Refreshed {boards} leaderboards ({rows:,} rows, top {k})")
+    return boards
+
+def sort_key(row):
+    return (-float(row["predicted_tip_pct"]), row["restaurant_id"])
+
+def in_scope(row, scope, key):
+    if scope == "city":
+        return row["city"] == key
+    if scope == "category":
+        return row["tip_category"] == key
+    return True
+
+def fetch_board(cur, scope, key):
+    cur.execute("""
+        SELECT restaurant_id, name, city, stars, predicted_tip_pct, tip_category
+        FROM tip_leaderboard
+        WHERE scope = %s AND scope_key = %s
+        ORDER BY rank
+    """, (scope, key))
+    return [dict(zip(COLUMNS, row)) for row in cur.fetchall()]
+
+def fetch_changed(cur, restaurant_ids):
+    placeholders = ", ".join(["%s"] * len(restaurant_ids))
+    cur.execute(f"""
+        SELECT r.restaurant_id, r.name, r.city, r.stars, t.predicted_tip_pct, t.tip_category
+        FROM tip_predictions t
+        JOIN restaurants r ON r.restaurant_id = t.restaurant_id
+        WHERE r.restaurant_id IN ({placeholders})
+    """, list(restaurant_ids))
+    return {row[0]: dict(zip(COLUMNS, row)) for row in cur.fetchall()}
+
+def rank_from_base(cur, scope, key, k):
+    cur.execute(f"""
+        SELECT r.restaurant_id, r.name, r.city, r.stars, t.predicted_tip_pct, t.tip_category
+        FROM tip_predictions t
+        JOIN restaurants r ON r.restaurant_id = t.restaurant_id
+        {SCOPE_FILTERS[scope]}
+        ORDER BY t.predicted_tip_pct DESC, r.restaurant_id
+        LIMIT %s
+    """, ((key, k) if scope != "global" else (k,)))
+    return [dict(zip(COLUMNS, row)) for row in cur.fetchall()]
+
+def lock_board(cur, scope, key):
+    # Held until commit. Boards are locked in sorted order, so two workers
+    # cannot deadlock.
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"tip_leaderboard:{scope}:{key}",))
+
+def write_board(cur, scope, key, rows):
+    values = [(scope, key, rank, *(row[c] for c in COLUMNS))
+              for rank, row in enumerate(rows, start=1)]
+
+    # PostgreSQL upserts each rank and drops the ranks past the new end, so
+    # the (scope, scope_key, rank) key is never deleted and re-inserted. The
+    # DuckDB table has no key to collide on (see its migration 004).
+    if get_backend().name == "postgres":
+        cur.execute("DELETE FROM tip_leaderboard WHERE scope = %s AND scope_key = %s AND rank > %s",
+                    (scope, key, len(rows)))
+        if values:
+            cur.executemany(UPSERT_ROW, values)
+    else:
+        cur.execute("DELETE FROM tip_leaderboard WHERE scope = %s AND scope_key = %s", (scope, key))
+        if values:
+            cur.executemany(INSERT_ROW, values)
+
+def merge_board(board, changed, scope, key, k):
+    # Everything not on a full board ranks below its last row, so the merge
+    # is exact as long as k rows still rank at or above that floor. Otherwise
+    # the caller re-ranks the scope from tip_predictions.
+    kept = [row for row in board if row["restaurant_id"] not in changed]
+    entrants = [row for row in changed.values() if in_scope(row, scope, key)]
+    merged = sorted(kept + entrants, key=sort_key)
+
+    if len(board) >= k:
+        floor = sort_key(board[-1])
+        if sum(1 for row in merged if sort_key(row) <= floor) < k:
+            return None
+    return merged[:k]
+
+def update_restaurants(restaurant_ids, k=TOP_K):
+    # Incremental path for a few re-scored restaurants: only the boards they
+    # were on or now qualify for are touched, and each is rewritten from its
+    # own K rows plus the changed restaurants.
+    if not restaurant_ids:
+        return 0, 0
+
+    conn = connect()
+    cur = conn.cursor()
+    placeholders = ", ".join(["%s"] * len(restaurant_ids))
+    changed = fetch_changed(cur, restaurant_ids)
+
+    scopes = {("global", "")}
+    for row in changed.values():
+        if row["city"] is not None:
+            scopes.add(("city", row["city"]))
+        if row["tip_category"] is not None:
+            scopes.add(("category", row["tip_category"]))
+
+    cur.execute(f"""
+        SELECT DISTINCT scope, scope_key FROM tip_leaderboard
+        WHERE restaurant_id IN ({placeholders})
+    """, list(restaurant_ids))
+    scopes.update(cur.fetchall())
+
+    # On PostgreSQL several ingest workers can update the same board. Each
+    # takes the board's lock and re-reads its restaurants' predictions, so
+    # it merges into the board the previous worker committed and never
+    # writes an older prediction over a newer one. DuckDB has a single
+    # writer and needs neither.
+    concurrent = get_backend().name == "postgres"
+    rebuilt = 0
+    for scope, key in sorted(scopes):
+        if concurrent:
+            lock_board(cur, scope, key)
+            changed = fetch_changed(cur, restaurant_ids)
+        rows = merge_board(fetch_board(cur, scope, key), changed, scope, key, k)
+        if rows is None:
+            rows = rank_from_base(cur, scope, key, k)
+            rebuilt += 1
+        write_board(cur, scope, key, rows)
+
+    conn.commit()
+    cur.close()
+    conn.close()
+    return len(scopes), rebuilt
+
+def top_restaurants(scope="global", key="", k=10):
+    conn = connect()
+    df = read_sql("""
+        SELECT rank, restaurant_id, name, city, stars, predicted_tip_pct, tip_category
+        FROM tip_leaderboard
+        WHERE scope = %s AND scope_key = %s AND rank <= %s
+        ORDER BY rank
+    """, conn, params=(scope, key, k))
+
+    # Boards are empty until the first refresh; answer from the base tables
+    # rather than showing nothing.
+    if df.empty:
+        cur = conn.cursor()
+        rows = rank_from_base(cur, scope, key, k)
+        cur.close()
+        df = pd.DataFrame(rows, columns=COLUMNS)
+        df.insert(0, "rank", range(1, len(df) + 1))
+    conn.close()
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Top-K restaurant leaderboards")
+    parser.add_argument("--refresh", action="store_true", help="rebuild every leaderboard")
+    parser.add_argument("--scope", choices=list(SCOPE_FILTERS), default="global")
+    parser.add_argument("--key", default="", help="city or tip category for --scope")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.refresh:
+        refresh_leaderboards()
+    print(top_restaurants(args.scope, args.key, args.k).to_string(index=False))
@@ -0,0 +1,219 @@
+import argparse
+import os
+import random
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import app
+from leaderboard import top_restaurants
+from storage import connect, connections_opened, get_backend
+
+DURATION = float(os.environ.get("TIP_LOAD_DURATION", 10))
+THINK_MS = float(os.environ.get("TIP_LOAD_THINK_MS", 0))
+SAMPLE_SECONDS = 0.25
+
+def overview_load(rng, cities):
+    app.run_queries(app.OVERVIEW_QUERIES)
+
+def explore_by_city_load(rng, cities):
+    # The reads explore_by_city_page makes for one render, with a random city,
+    # sort order and page size.
+    app.city_names()
+    city = rng.choice(cities)
+    summary = app.city_summary(city)
+    if summary["count"] == 0:
+        return
+
+    sort_label = rng.choice(list(app.SORT_COLUMNS))
+    app.city_page(city, sort_label, rng.random() < 0.5, rng.choice(app.PAGE_SIZES))
+    top_restaurants("city", city, 10)
+    app.city_histogram(city, summary["min_tip"], summary["max_tip"])
+
+    if city in app.CITY_COORDS:
+        if summary["count"] > app.MAP_POINT_LIMIT:
+            app.map_grid(city)
+        else:
+            app.city_points(city)
+
+def visualizations_load(rng, cities):
+    app.visualization_frames()
+
+def clusters_load(rng, cities):
+    app.compute_clusters()
+
+PAGES = {
+    "overview": overview_load,
+    "explore_by_city": explore_by_city_load,
+    "visualizations": visualizations_load,
+    "clusters": clusters_load,
+}
+
+class ConnectionMonitor(threading.Thread):
+    # Samples server-side connections for this database while a level runs.
+    # Only PostgreSQL has a server to ask; on DuckDB the report falls back to
+    # the connections opened through storage.connect().
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.stopped = threading.Event()
+        self.samples = []
+        self.max_connections = None
+        self.conn = None
+
+        if get_backend().name == "postgres":
+            self.conn = connect()
+            self.conn.autocommit = True
+            cur = self.conn.cursor()
+            cur.execute("SHOW max_connections")
+            self.max_connections = int(cur.fetchone()[0])
+            cur.close()
+
+    def sample(self, cur):
+        cur.execute("""
+            SELECT COUNT(*), COUNT(*) FILTER (WHERE state = 'active')
+            FROM pg_stat_activity
+            WHERE datname = current_database() AND pid <> pg_backend_pid()
+        """)
+        self.samples.append(cur.fetchone())
+
+    def run(self):
+        if self.conn is None:
+            return
+        cur = self.conn.cursor()
+        self.sample(cur)
+        while not self.stopped.wait(SAMPLE_SECONDS):
+            self.sample(cur)
+        cur.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        if self.conn is not None:
+            self.conn.close()
+
+    def peak(self):
+        if not self.samples:
+            return None, None
+        return max(total for total, _ in self.samples), max(active for _, active in self.samples)
+
+def session(pages, cities, deadline, think_s, seed, results):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        page = rng.choice(pages)
+        start = time.perf_counter()
+        error = None
+        try:
+            PAGES[page](rng, cities)
+        except Exception as e:
+            error = type(e).__name__
+        results.append((page, time.perf_counter() - start, error))
+        if think_s:
+            time.sleep(think_s)
+
+def summarize(label, rows, seconds):
+    latencies = np.array([elapsed for _, elapsed, _ in rows]) * 1000
+    errors = sum(1 for _, _, error in rows if error)
+    if len(latencies) == 0:
+        latencies = np.array([np.nan])
+    return {
+        "scope": label,
+        "loads": len(rows),
+        "per_s": len(rows) / seconds,
+        "p50_ms": np.percentile(latencies, 50),
+        "p95_ms": np.percentile(latencies, 95),
+        "p99_ms": np.percentile(latencies, 99),
+        "error_rate": errors / max(len(rows), 1),
+    }
+
+def run_level(users, pages, cities, duration=DURATION, think_ms=THINK_MS, seed=0):
+    results = []
+    monitor = ConnectionMonitor()
+    opened_before = connections_opened()
+    monitor.start()
+
+    start = time.perf_counter()
+    deadline = start + duration
+    threads = [threading.Thread(target=session, daemon=True,
+                                args=(pages, cities, deadline, think_ms / 1000, seed + i, results))
+               for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    monitor.stop()
+    opened = connections_opened() - opened_before
+    peak_total, peak_active = monitor.peak()
+
+    per_page = pd.DataFrame([summarize(page, [r for r in results if r[0] == page], elapsed)
+                             for page in pages]).set_index("scope")
+    errors = pd.Series([error for _, _, error in results if error], dtype=object)
+
+    overall = summarize(f"{users} users", results, elapsed)
+    overall.update({
+        "users": users,
+        "connects": opened,
+        "connects_per_load": opened / max(len(results), 1),
+        "peak_db_conns": peak_total,
+        "peak_active": peak_active,
+        "max_connections": monitor.max_connections,
+    })
+    return overall, per_page, errors.value_counts()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay the app's page data access from concurrent sessions")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 5, 10, 20],
+                        help="concurrent sessions per level, e.g. --users 1 10 50")
+    parser.add_argument("--duration", type=float, default=DURATION, help="seconds per level")
+    parser.add_argument("--think-ms", type=float, default=THINK_MS,
+                        help="pause between a session's page loads")
+    parser.add_argument("--pages", nargs="+", choices=list(PAGES), default=list(PAGES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the per-level summary to this CSV file")
+    args = parser.parse_args()
+
+    cities = app.city_names()
+    if not cities:
+        raise SystemExit("No restaurants loaded; run the pipeline first")
+
+    # One untimed pass so pool start-up and the snapshot reader are not
+    # charged to the first level.
+    rng = random.Random(args.seed)
+    for page in args.pages:
+        try:
+            PAGES[page](rng, cities)
+        except Exception as e:
+            print(f"Warm-up {page} failed: {type(e).__name__}: {e}")
+
+    print(f"Backend: {get_backend().name}, pages: {', '.join(args.pages)}, "
+          f"{args.duration:g}s per level, think time {args.think_ms:g} ms")
+
+    levels = []
+    for users in args.users:
+        overall, per_page, errors = run_level(users, args.pages, cities, args.duration,
+                                              args.think_ms, args.seed)
+        levels.append(overall)
+
+        print(f"\n{users} concurrent sessions: {overall['loads']:,} page loads, "
+              f"{overall['per_s']:.1f}/s, {overall['error_rate']:.1%} errors")
+        print(per_page.round(2).to_string())
+        if overall["peak_db_conns"] is not None:
+            print(f"  DB connections: peak {overall['peak_db_conns']} "
+                  f"({overall['peak_active']} active) of max_connections {overall['max_connections']}")
+        print(f"  connect() calls: {overall['connects']:,} "
+              f"({overall['connects_per_load']:.1f} per page load)")
+        for error, count in errors.items():
+            print(f"  {error}: {count:,}")
+
+    summary = pd.DataFrame(levels).set_index("users").drop(columns=["scope"])
+    if get_backend().name != "postgres":
+        summary = summary.drop(columns=["peak_db_conns", "peak_active", "max_connections"])
+    print("\nSummary")
+    print(summary.round(2).to_string())
+
+    if args.output:
+        summary.to_csv(args.output)
+        print(f"Saved summary: {args.output}")
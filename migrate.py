@@ -0,0 +1,132 @@
+import argparse
+import glob
+import os
+import re
+
+from storage import connect, get_backend
+
+MIGRATIONS_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+def migrations_dir():
+    return os.path.join(MIGRATIONS_ROOT, get_backend().migrations_subdir)
+
+def ensure_migrations_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(100) PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def list_migrations():
+    migrations = []
+    for path in sorted(glob.glob(os.path.join(migrations_dir(), "*.sql"))):
+        version = os.path.splitext(os.path.basename(path))[0]
+        if re.match(r"^\d{3}_", version):
+            migrations.append((version, path))
+    return migrations
+
+def list_optional():
+    optional = {}
+    for path in sorted(glob.glob(os.path.join(migrations_dir(), "optional", "*.sql"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        optional[name] = path
+    return optional
+
+def applied_versions(cur):
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+def pending_migrations(optional=()):
+    available = list_optional()
+    for name in optional:
+        if name not in available:
+            raise ValueError(f"Unknown optional migration: {name} "
+                             f"(available: {', '.join(sorted(available)) or 'none'})")
+
+    conn = connect()
+    cur = conn.cursor()
+    ensure_migrations_table(cur)
+    conn.commit()
+    done = applied_versions(cur)
+    cur.close()
+    conn.close()
+
+    pending = [(v, p) for v, p in list_migrations() if v not in done]
+    pending += [(f"optional/{name}", available[name]) for name in optional
+                if f"optional/{name}" not in done]
+    return pending
+
+def apply_migration(conn, version, path):
+    with open(path) as f:
+        sql = f.read()
+
+    cur = conn.cursor()
+    try:
+        cur.execute(sql)
+        cur.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def migrate(optional=()):
+    pending = pending_migrations(optional)
+
+    if not pending:
+        print("Schema is up to date")
+        return []
+
+    conn = connect()
+    for version, path in pending:
+        print(f"  Applying {version}...")
+        apply_migration(conn, version, path)
+    conn.close()
+
+    print(f"Applied {len(pending)} migration(s)")
+    return [version for version, _ in pending]
+
+def show_status():
+    conn = connect()
+    cur = conn.cursor()
+    ensure_migrations_table(cur)
+    conn.commit()
+    done = applied_versions(cur)
+    cur.close()
+    conn.close()
+
+    print(f"Migrations ({get_backend().name}):")
+    for version, _ in list_migrations():
+        mark = "x" if version in done else " "
+        print(f"  [{mark}] {version}")
+    for name in list_optional():
+        mark = "x" if f"optional/{name}" in done else " "
+        print(f"  [{mark}] optional/{name}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--status", action="store_true",
+                        help="list migrations and whether they have been applied")
+    parser.add_argument("--with", dest="optional", action="append", default=[],
+                        metavar="NAME", help="also apply an optional migration, "
+                        "e.g. --with partition_reviews")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="capture EXPLAIN ANALYZE before and after applying")
+    args = parser.parse_args()
+
+    if args.status:
+        show_status()
+    elif args.benchmark:
+        import benchmark_queries
+
+        if not pending_migrations(args.optional):
+            print("Schema is up to date, nothing to benchmark")
+        else:
+            before = benchmark_queries.run_benchmark("before")
+            migrate(args.optional)
+            after = benchmark_queries.run_benchmark("after")
+            benchmark_queries.compare(before, after)
+    else:
+        migrate(args.optional)
@@ -1,10 +1,4 @@
-DROP TABLE IF EXISTS tip_predictions;
-DROP TABLE IF EXISTS restaurant_features;
-DROP TABLE IF EXISTS menu_items;
-DROP TABLE IF EXISTS reviews;
-DROP TABLE IF EXISTS restaurants;
-
-CREATE TABLE restaurants (
+CREATE TABLE IF NOT EXISTS restaurants (
     restaurant_id VARCHAR(50) PRIMARY KEY,
     name VARCHAR(200),
     city VARCHAR(100),
@@ -14,7 +8,7 @@ CREATE TABLE restaurants (
     price_range VARCHAR(5)
 );
 
-CREATE TABLE reviews (
+CREATE TABLE IF NOT EXISTS reviews (
     review_id VARCHAR(50) PRIMARY KEY,
     restaurant_id VARCHAR(50),
     stars INT,
@@ -23,7 +17,7 @@ CREATE TABLE reviews (
     FOREIGN KEY (restaurant_id) REFERENCES restaurants(restaurant_id)
 );
 
-CREATE TABLE menu_items (
+CREATE TABLE IF NOT EXISTS menu_items (
     item_id SERIAL PRIMARY KEY,
     restaurant_id VARCHAR(50),
     item_name VARCHAR(200),
@@ -32,7 +26,7 @@ CREATE TABLE menu_items (
 );
 
 
-CREATE TABLE tip_predictions (
+CREATE TABLE IF NOT EXISTS tip_predictions (
     restaurant_id VARCHAR(50) PRIMARY KEY,
     predicted_tip_pct DECIMAL(5,2),
     tip_category VARCHAR(20),
@@ -41,7 +35,7 @@ CREATE TABLE tip_predictions (
 
 
 
-CREATE TABLE restaurant_features (
+CREATE TABLE IF NOT EXISTS restaurant_features (
     restaurant_id VARCHAR(50) PRIMARY KEY,
     avg_sentiment DECIMAL(4,3),
     positive_reviews INT,
@@ -52,5 +46,5 @@ CREATE TABLE restaurant_features (
 );
 
 
-CREATE INDEX idx_city ON restaurants(city);
-CREATE INDEX idx_restaurant_reviews ON reviews(restaurant_id);
+CREATE INDEX IF NOT EXISTS idx_city ON restaurants(city);
+CREATE INDEX IF NOT EXISTS idx_restaurant_reviews ON reviews(restaurant_id);
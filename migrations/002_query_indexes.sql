@@ -0,0 +1,34 @@
+-- explore_by_city_page / compute_clusters: filter restaurants by city, then
+-- join features and predictions on restaurant_id.
+CREATE INDEX IF NOT EXISTS idx_restaurants_city_cover
+    ON restaurants (city, restaurant_id) INCLUDE (name, stars);
+DROP INDEX IF EXISTS idx_city;
+
+-- show_top / plot_top_restaurants:
+-- WHERE tip_category = 'high' ORDER BY predicted_tip_pct DESC LIMIT 10
+CREATE INDEX IF NOT EXISTS idx_tip_predictions_category_pct
+    ON tip_predictions (tip_category, predicted_tip_pct DESC) INCLUDE (restaurant_id);
+
+-- city page ORDER BY predicted_tip_pct and MIN/MAX in the overview.
+CREATE INDEX IF NOT EXISTS idx_tip_predictions_pct
+    ON tip_predictions (predicted_tip_pct DESC) INCLUDE (restaurant_id, tip_category);
+
+-- feature/prediction joins in the app and visualizations read only these
+-- columns, so they can be answered with index-only scans.
+CREATE INDEX IF NOT EXISTS idx_restaurant_features_cover
+    ON restaurant_features (restaurant_id) INCLUDE (avg_sentiment, service_mentions, avg_price);
+CREATE INDEX IF NOT EXISTS idx_restaurant_features_service
+    ON restaurant_features (service_mentions) INCLUDE (restaurant_id);
+
+-- process_restaurant: AVG(price) per restaurant and star counts per restaurant.
+CREATE INDEX IF NOT EXISTS idx_menu_items_restaurant
+    ON menu_items (restaurant_id) INCLUDE (price);
+CREATE INDEX IF NOT EXISTS idx_reviews_restaurant_stars
+    ON reviews (restaurant_id) INCLUDE (stars);
+DROP INDEX IF EXISTS idx_restaurant_reviews;
+
+ANALYZE restaurants;
+ANALYZE reviews;
+ANALYZE menu_items;
+ANALYZE tip_predictions;
+ANALYZE restaurant_features;
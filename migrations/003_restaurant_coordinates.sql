@@ -0,0 +1,7 @@
+-- Stable per-restaurant map coordinates, filled in once by geocode.py.
+ALTER TABLE restaurants ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION;
+ALTER TABLE restaurants ADD COLUMN IF NOT EXISTS lon DOUBLE PRECISION;
+
+-- Map grid aggregation reads city, lat and lon only.
+CREATE INDEX IF NOT EXISTS idx_restaurants_city_coords
+    ON restaurants (city) INCLUDE (restaurant_id, lat, lon);
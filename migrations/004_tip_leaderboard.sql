@@ -0,0 +1,19 @@
+-- Precomputed top-K restaurants per scope: one 'global' board (scope_key ''),
+-- one per city and one per tip category. Maintained by leaderboard.py.
+CREATE TABLE IF NOT EXISTS tip_leaderboard (
+    scope VARCHAR(20) NOT NULL,
+    scope_key VARCHAR(100) NOT NULL,
+    rank INT NOT NULL,
+    restaurant_id VARCHAR(50) NOT NULL,
+    name VARCHAR(200),
+    city VARCHAR(100),
+    stars DECIMAL(2,1),
+    predicted_tip_pct DECIMAL(5,2),
+    tip_category VARCHAR(20),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (scope, scope_key, rank)
+);
+
+-- Finds the boards a re-scored restaurant currently sits on.
+CREATE INDEX IF NOT EXISTS idx_tip_leaderboard_restaurant
+    ON tip_leaderboard (restaurant_id);
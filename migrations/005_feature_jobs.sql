@@ -0,0 +1,28 @@
+-- Work queue for distributed sentiment processing (job_queue.py). Each row
+-- is a batch of restaurants; workers claim rows with FOR UPDATE SKIP LOCKED
+-- and hold them under a lease that their heartbeat keeps extending.
+-- PostgreSQL only: DuckDB runs in a single process and uses analyze_all().
+CREATE TABLE IF NOT EXISTS feature_jobs (
+    job_id SERIAL PRIMARY KEY,
+    run_id VARCHAR(50) NOT NULL,
+    restaurant_ids TEXT[] NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    worker_id VARCHAR(100),
+    lease_expires_at TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    restaurants_done INT NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CHECK (status IN ('pending', 'running', 'done', 'failed'))
+);
+
+-- Claim scans pending jobs in id order; stale-lease reclaim scans running ones.
+CREATE INDEX IF NOT EXISTS idx_feature_jobs_pending
+    ON feature_jobs (job_id) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_feature_jobs_running_lease
+    ON feature_jobs (lease_expires_at) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS idx_feature_jobs_run
+    ON feature_jobs (run_id, status);
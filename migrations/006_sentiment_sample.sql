@@ -0,0 +1,6 @@
+-- Sampled sentiment (TIP_SENTIMENT_EPSILON): how many reviews were scored
+-- and the confidence interval of avg_sentiment. NULL when every review was
+-- scored and avg_sentiment is exact.
+ALTER TABLE restaurant_features ADD COLUMN IF NOT EXISTS sentiment_sample_size INT;
+ALTER TABLE restaurant_features ADD COLUMN IF NOT EXISTS sentiment_ci_low DECIMAL(4,3);
+ALTER TABLE restaurant_features ADD COLUMN IF NOT EXISTS sentiment_ci_high DECIMAL(4,3);
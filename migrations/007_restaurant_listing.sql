@@ -0,0 +1,45 @@
+-- One row per scored restaurant with every column the Explore by City table
+-- shows, so its keyset pages are read from a single table. Maintained by
+-- city_listing.py after predictions are saved.
+CREATE TABLE IF NOT EXISTS restaurant_listing (
+    restaurant_id VARCHAR(50) PRIMARY KEY,
+    city VARCHAR(100),
+    name VARCHAR(200),
+    stars DECIMAL(2,1),
+    avg_sentiment DECIMAL(4,3),
+    service_mentions INT,
+    avg_price DECIMAL(8,2),
+    predicted_tip_pct DECIMAL(5,2),
+    tip_category VARCHAR(20)
+);
+
+-- city_page: WHERE city = %s AND (<col>, restaurant_id) past the cursor
+-- ORDER BY <col>, restaurant_id LIMIT n, in either direction.
+CREATE INDEX IF NOT EXISTS idx_restaurant_listing_city_tip
+    ON restaurant_listing (city, predicted_tip_pct, restaurant_id);
+CREATE INDEX IF NOT EXISTS idx_restaurant_listing_city_stars
+    ON restaurant_listing (city, stars, restaurant_id);
+CREATE INDEX IF NOT EXISTS idx_restaurant_listing_city_sentiment
+    ON restaurant_listing (city, avg_sentiment, restaurant_id);
+CREATE INDEX IF NOT EXISTS idx_restaurant_listing_city_service
+    ON restaurant_listing (city, service_mentions, restaurant_id);
+CREATE INDEX IF NOT EXISTS idx_restaurant_listing_city_price
+    ON restaurant_listing (city, avg_price, restaurant_id);
+CREATE INDEX IF NOT EXISTS idx_restaurant_listing_city_name
+    ON restaurant_listing (city, name, restaurant_id);
+
+INSERT INTO restaurant_listing
+    (restaurant_id, city, name, stars, avg_sentiment, service_mentions, avg_price,
+     predicted_tip_pct, tip_category)
+SELECT r.restaurant_id, r.city, r.name, r.stars, f.avg_sentiment, f.service_mentions,
+       f.avg_price, t.predicted_tip_pct, t.tip_category
+FROM restaurants r
+JOIN restaurant_features f ON f.restaurant_id = r.restaurant_id
+JOIN tip_predictions t ON t.restaurant_id = r.restaurant_id
+ON CONFLICT (restaurant_id) DO NOTHING;
+
+-- The primary key index already covers restaurant_id lookups, and the
+-- city page no longer reads these columns through the join.
+DROP INDEX IF EXISTS idx_restaurant_features_cover;
+
+ANALYZE restaurant_listing;
@@ -0,0 +1,44 @@
+-- DuckDB variant of migrations/001_initial_schema.sql. Foreign keys are left
+-- out because DuckDB rejects updates to rows referenced by a foreign key,
+-- and SERIAL becomes an explicit sequence.
+CREATE TABLE IF NOT EXISTS restaurants (
+    restaurant_id VARCHAR(50) PRIMARY KEY,
+    name VARCHAR(200),
+    city VARCHAR(100),
+    state VARCHAR(50),
+    stars DECIMAL(2,1),
+    review_count INT,
+    price_range VARCHAR(5)
+);
+
+CREATE TABLE IF NOT EXISTS reviews (
+    review_id VARCHAR(50) PRIMARY KEY,
+    restaurant_id VARCHAR(50),
+    stars INT,
+    review_text TEXT,
+    review_date DATE
+);
+
+CREATE SEQUENCE IF NOT EXISTS menu_items_item_id_seq;
+
+CREATE TABLE IF NOT EXISTS menu_items (
+    item_id INTEGER PRIMARY KEY DEFAULT nextval('menu_items_item_id_seq'),
+    restaurant_id VARCHAR(50),
+    item_name VARCHAR(200),
+    price DECIMAL(8,2)
+);
+
+CREATE TABLE IF NOT EXISTS tip_predictions (
+    restaurant_id VARCHAR(50) PRIMARY KEY,
+    predicted_tip_pct DECIMAL(5,2),
+    tip_category VARCHAR(20)
+);
+
+CREATE TABLE IF NOT EXISTS restaurant_features (
+    restaurant_id VARCHAR(50) PRIMARY KEY,
+    avg_sentiment DECIMAL(4,3),
+    positive_reviews INT,
+    negative_reviews INT,
+    service_mentions INT,
+    avg_price DECIMAL(8,2)
+);
@@ -0,0 +1,2 @@
+ALTER TABLE restaurants ADD COLUMN IF NOT EXISTS lat DOUBLE;
+ALTER TABLE restaurants ADD COLUMN IF NOT EXISTS lon DOUBLE;
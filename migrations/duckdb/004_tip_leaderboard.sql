@@ -0,0 +1,19 @@
+-- DuckDB rejects deleting and re-inserting the same primary key inside one
+-- transaction, which is how a board is rewritten, so the key is a plain index.
+CREATE TABLE IF NOT EXISTS tip_leaderboard (
+    scope VARCHAR(20) NOT NULL,
+    scope_key VARCHAR(100) NOT NULL,
+    rank INT NOT NULL,
+    restaurant_id VARCHAR(50) NOT NULL,
+    name VARCHAR(200),
+    city VARCHAR(100),
+    stars DECIMAL(2,1),
+    predicted_tip_pct DECIMAL(5,2),
+    tip_category VARCHAR(20),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_tip_leaderboard_scope
+    ON tip_leaderboard (scope, scope_key, rank);
+CREATE INDEX IF NOT EXISTS idx_tip_leaderboard_restaurant
+    ON tip_leaderboard (restaurant_id);
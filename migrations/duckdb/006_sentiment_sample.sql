@@ -0,0 +1,3 @@
+ALTER TABLE restaurant_features ADD COLUMN IF NOT EXISTS sentiment_sample_size INT;
+ALTER TABLE restaurant_features ADD COLUMN IF NOT EXISTS sentiment_ci_low DECIMAL(4,3);
+ALTER TABLE restaurant_features ADD COLUMN IF NOT EXISTS sentiment_ci_high DECIMAL(4,3);
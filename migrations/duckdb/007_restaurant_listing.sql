@@ -0,0 +1,25 @@
+-- One row per scored restaurant with every column the Explore by City table
+-- shows, so its keyset pages are read from a single table. Maintained by
+-- city_listing.py after predictions are saved. DuckDB's ART indexes answer
+-- point lookups, not ordered range scans, so only the key is indexed here.
+CREATE TABLE IF NOT EXISTS restaurant_listing (
+    restaurant_id VARCHAR(50) PRIMARY KEY,
+    city VARCHAR(100),
+    name VARCHAR(200),
+    stars DECIMAL(2,1),
+    avg_sentiment DECIMAL(4,3),
+    service_mentions INT,
+    avg_price DECIMAL(8,2),
+    predicted_tip_pct DECIMAL(5,2),
+    tip_category VARCHAR(20)
+);
+
+INSERT INTO restaurant_listing
+    (restaurant_id, city, name, stars, avg_sentiment, service_mentions, avg_price,
+     predicted_tip_pct, tip_category)
+SELECT r.restaurant_id, r.city, r.name, r.stars, f.avg_sentiment, f.service_mentions,
+       f.avg_price, t.predicted_tip_pct, t.tip_category
+FROM restaurants r
+JOIN restaurant_features f ON f.restaurant_id = r.restaurant_id
+JOIN tip_predictions t ON t.restaurant_id = r.restaurant_id
+ON CONFLICT (restaurant_id) DO NOTHING;
@@ -0,0 +1,37 @@
+-- Rebuilds reviews as a hash-partitioned table on restaurant_id so the
+-- per-restaurant scans in sentiment_analysis only touch one partition.
+-- The primary key must contain the partition key, so it becomes
+-- (restaurant_id, review_id).
+ALTER TABLE reviews RENAME TO reviews_unpartitioned;
+ALTER TABLE reviews_unpartitioned RENAME CONSTRAINT reviews_pkey TO reviews_unpartitioned_pkey;
+DROP INDEX IF EXISTS idx_reviews_restaurant_stars;
+DROP INDEX IF EXISTS idx_restaurant_reviews;
+
+CREATE TABLE reviews (
+    review_id VARCHAR(50),
+    restaurant_id VARCHAR(50),
+    stars INT,
+    review_text TEXT,
+    review_date DATE,
+    PRIMARY KEY (restaurant_id, review_id),
+    FOREIGN KEY (restaurant_id) REFERENCES restaurants(restaurant_id)
+) PARTITION BY HASH (restaurant_id);
+
+CREATE TABLE reviews_p0 PARTITION OF reviews FOR VALUES WITH (MODULUS 8, REMAINDER 0);
+CREATE TABLE reviews_p1 PARTITION OF reviews FOR VALUES WITH (MODULUS 8, REMAINDER 1);
+CREATE TABLE reviews_p2 PARTITION OF reviews FOR VALUES WITH (MODULUS 8, REMAINDER 2);
+CREATE TABLE reviews_p3 PARTITION OF reviews FOR VALUES WITH (MODULUS 8, REMAINDER 3);
+CREATE TABLE reviews_p4 PARTITION OF reviews FOR VALUES WITH (MODULUS 8, REMAINDER 4);
+CREATE TABLE reviews_p5 PARTITION OF reviews FOR VALUES WITH (MODULUS 8, REMAINDER 5);
+CREATE TABLE reviews_p6 PARTITION OF reviews FOR VALUES WITH (MODULUS 8, REMAINDER 6);
+CREATE TABLE reviews_p7 PARTITION OF reviews FOR VALUES WITH (MODULUS 8, REMAINDER 7);
+
+INSERT INTO reviews (review_id, restaurant_id, stars, review_text, review_date)
+SELECT review_id, restaurant_id, stars, review_text, review_date
+FROM reviews_unpartitioned;
+
+DROP TABLE reviews_unpartitioned;
+
+CREATE INDEX idx_reviews_restaurant_stars ON reviews (restaurant_id) INCLUDE (stars);
+
+ANALYZE reviews;
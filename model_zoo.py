@@ -0,0 +1,150 @@
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+from sklearn.linear_model import ElasticNet, Lasso, LinearRegression, LogisticRegression, Ridge
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+LATENCY_SLO_MS = float(os.environ.get("TIP_LATENCY_SLO_MS", 5.0))
+SELECTION_PATH = os.environ.get("TIP_MODEL_SELECTION_PATH",
+                                os.path.join("models", "model_selection.json"))
+VALIDATION_SIZE = float(os.environ.get("TIP_VALIDATION_SIZE", 0.25))
+
+SINGLE_ROW_TRIALS = 200
+BATCH_ROWS = 1000
+
+# name -> (kind, factory). Regressors predict the tip percentage and are
+# ranked by mean absolute error; classifiers predict the tip category and
+# are ranked by accuracy.
+REGISTRY = {
+    "linear": ("regressor", lambda: LinearRegression()),
+    "ridge": ("regressor", lambda: make_pipeline(StandardScaler(), Ridge(alpha=1.0))),
+    "lasso": ("regressor", lambda: make_pipeline(StandardScaler(), Lasso(alpha=0.01))),
+    "elasticnet": ("regressor", lambda: make_pipeline(StandardScaler(),
+                                                      ElasticNet(alpha=0.01, l1_ratio=0.5))),
+    "hgb": ("regressor", lambda: HistGradientBoostingRegressor(max_iter=200, random_state=42)),
+    "logistic": ("classifier", lambda: LogisticRegression(max_iter=1000)),
+    "hgb_classifier": ("classifier", lambda: HistGradientBoostingClassifier(max_iter=200,
+                                                                            random_state=42)),
+}
+
+def register(name, kind, factory):
+    if kind not in ("regressor", "classifier"):
+        raise ValueError(f"Unknown model kind: {kind} (expected regressor or classifier)")
+    REGISTRY[name] = (kind, factory)
+
+def single_row_latency(model, X):
+    rows = [X.iloc[[i % len(X)]] for i in range(SINGLE_ROW_TRIALS)]
+    model.predict(rows[0])
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 95))
+
+def batch_latency(model, X):
+    batch = X.iloc[np.arange(BATCH_ROWS) % len(X)]
+    model.predict(batch)
+    start = time.perf_counter()
+    model.predict(batch)
+    return (time.perf_counter() - start) * 1000
+
+def fit(name, X, y, to_category):
+    kind, factory = REGISTRY[name]
+    model = factory()
+    model.fit(X, [to_category(t) for t in y] if kind == "classifier" else y)
+    return model
+
+def score(model, kind, X, y, to_category):
+    predictions = model.predict(X)
+    y_cat = np.array([to_category(t) for t in y])
+    if kind == "classifier":
+        return None, float(np.mean(predictions == y_cat))
+    mae = float(np.mean(np.abs(predictions - np.asarray(y))))
+    return mae, float(np.mean(np.array([to_category(p) for p in predictions]) == y_cat))
+
+def evaluate(name, X_train, X_val, y_train, y_val, to_category):
+    kind = REGISTRY[name][0]
+
+    start = time.perf_counter()
+    model = fit(name, X_train, y_train, to_category)
+    fit_s = time.perf_counter() - start
+
+    mae, accuracy = score(model, kind, X_val, y_val, to_category)
+    p50_ms, p95_ms = single_row_latency(model, X_val)
+    return model, {
+        "name": name,
+        "kind": kind,
+        "mae": mae,
+        "category_accuracy": accuracy,
+        "fit_s": round(fit_s, 4),
+        "single_row_p50_ms": round(p50_ms, 4),
+        "single_row_p95_ms": round(p95_ms, 4),
+        "batch_ms": round(batch_latency(model, X_val), 4),
+        "batch_rows": BATCH_ROWS,
+        "size_bytes": len(pickle.dumps(model)),
+    }
+
+def pick(results, kind, slo_ms):
+    candidates = [r for r in results if r["kind"] == kind]
+    within = [r for r in candidates if r["single_row_p95_ms"] <= slo_ms]
+    if not within:
+        print(f"  No {kind} meets the {slo_ms:g} ms SLO; using the fastest")
+        return min(candidates, key=lambda r: r["single_row_p95_ms"])
+    if kind == "regressor":
+        return min(within, key=lambda r: (r["mae"], r["single_row_p95_ms"]))
+    return max(within, key=lambda r: (r["category_accuracy"], -r["single_row_p95_ms"]))
+
+def select_models(X_train, X_test, y_train, y_test, to_category, slo_ms=LATENCY_SLO_MS,
+                  names=None, path=SELECTION_PATH, validation_size=VALIDATION_SIZE):
+    # Candidates are compared on a validation split carved out of the
+    # training rows. The two that are picked are refit on all training rows
+    # and scored once on the test split, which plays no part in the choice.
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=validation_size,
+                                                  random_state=42)
+    results = []
+    for name in names or REGISTRY:
+        _, metrics = evaluate(name, X_fit, X_val, y_fit, y_val, to_category)
+        results.append(metrics)
+
+    table = pd.DataFrame(results).set_index("name")
+    print(f"\nCandidates on the validation split (single-row SLO {slo_ms:g} ms at p95):")
+    print(table.drop(columns=["batch_rows"]).to_string())
+
+    chosen = {}
+    test = {}
+    for kind in ("regressor", "classifier"):
+        name = pick(results, kind, slo_ms)["name"]
+        chosen[kind] = fit(name, X_train, y_train, to_category)
+        mae, accuracy = score(chosen[kind], kind, X_test, y_test, to_category)
+        test[kind] = {"name": name, "mae": mae, "category_accuracy": accuracy}
+
+    print(f"\nSelected regressor: {test['regressor']['name']} "
+          f"(test MAE {test['regressor']['mae']:.2f})")
+    print(f"Selected classifier: {test['classifier']['name']} "
+          f"(test accuracy {test['classifier']['category_accuracy']:.1%})")
+
+    selection = {
+        "selected_at": time.time(),
+        "slo_ms": slo_ms,
+        "train_rows": len(X_fit),
+        "validation_rows": len(X_val),
+        "test_rows": len(X_test),
+        "regressor": test["regressor"]["name"],
+        "classifier": test["classifier"]["name"],
+        "test": test,
+        "candidates": results,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(selection, f, indent=2)
+    print(f"Saved model selection: {path}")
+
+    return chosen["regressor"], chosen["classifier"], selection
@@ -1,9 +1,45 @@
-import psycopg2
-import pandas as pd
+import argparse
+import os
+import pickle
+import time
+
 import numpy as np
 from sklearn.linear_model import LinearRegression, LogisticRegression
 from sklearn.model_selection import train_test_split
 
+from city_listing import refresh_listing
+from leaderboard import refresh_leaderboards, top_restaurants
+from model_zoo import LATENCY_SLO_MS, select_models
+from snapshot import publish_snapshot
+from storage import connect
+from text_features import SVD_PREFIX, add_text_features, text_build_id
+from typed_frames import FEATURE_SCHEMA, memory_mb, read_typed
+
+FEATURES = ['stars', 'price_num', 'avg_sentiment', 'service_mentions', 'avg_price']
+MODEL_PATH = os.environ.get("TIP_MODEL_PATH", os.path.join("models", "tip_models.pkl"))
+USE_TEXT_FEATURES = os.environ.get("TIP_USE_TEXT_FEATURES", "0") == "1"
+
+FEATURE_QUERY = """
+    SELECT 
+        r.restaurant_id,
+        r.stars,
+        r.price_range,
+        f.avg_sentiment,
+        f.positive_reviews,
+        f.service_mentions,
+        f.avg_price
+    FROM restaurants r
+    JOIN restaurant_features f ON r.restaurant_id = f.restaurant_id
+"""
+
+def to_category(tip):
+    if tip < 16:
+        return 'low'
+    elif tip <= 22:
+        return 'medium'
+    else:
+        return 'high'
+
 def train_linear(X_train, X_test, y_train, y_test):
     print("\n Linear Regression ")
     
@@ -22,14 +58,6 @@ def train_linear(X_train, X_test, y_train, y_test):
 def train_logistic(X_train, X_test, y_train, y_test):
     print("\n Logistic Regression ")
     
-    def to_category(tip):
-        if tip < 16:
-            return 'low'
-        elif tip <= 22:
-            return 'medium'
-        else:
-            return 'high'
-    
     y_train_cat = [to_category(t) for t in y_train]
     y_test_cat = [to_category(t) for t in y_test]
     
@@ -46,55 +74,37 @@ def train_logistic(X_train, X_test, y_train, y_test):
     return model, to_category
 
 def show_top():
-    conn = connect()
-    cur = conn.cursor()
-    
-    cur.execute("""
-        SELECT r.name, r.city, r.stars, t.predicted_tip_pct
-        FROM restaurants r
-        JOIN tip_predictions t ON r.restaurant_id = t.restaurant_id
-        WHERE t.tip_category = 'high'
-        ORDER BY t.predicted_tip_pct DESC
-        LIMIT 10
-    """)
+    top = top_restaurants("category", "high", 10)
     
     print("\nTop 10 restaurants for tips:")
-    for name, city, stars, tip in cur.fetchall():
+    for name, city, stars, tip in top[['name', 'city', 'stars', 'predicted_tip_pct']].itertuples(index=False):
         print(f"  {name} ({city}) - {stars}stars - {tip:.1f}%")
-    
-    cur.close()
-    conn.close()
 
-def get_data():
-    conn = connect()
+def get_data(restaurant_ids=None):
+    query = FEATURE_QUERY
+    params = None
+    if restaurant_ids is not None:
+        query += f"WHERE r.restaurant_id IN ({', '.join(['%s'] * len(restaurant_ids))})"
+        params = list(restaurant_ids)
     
-    query = """
-        SELECT 
-            r.restaurant_id,
-            r.stars,
-            r.price_range,
-            f.avg_sentiment,
-            f.positive_reviews,
-            f.service_mentions,
-            f.avg_price
-        FROM restaurants r
-        JOIN restaurant_features f ON r.restaurant_id = f.restaurant_id
-    """
-    
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = read_typed(query, FEATURE_SCHEMA, params=params)
     
     df['price_num'] = df['price_range'].map({
         '$': 1,
         '$$': 2,
         '$$$': 3,
         '$$$$': 4
-    })
-
-    df['price_num'] = df['price_num'].fillna(2)
+    }).astype('float32').fillna(2)
     
     return df
 
+def with_model_features(df, features, text_build=None, refresh=()):
+    # Models trained with --text-features also need the SVD text columns,
+    # from the build they were trained on.
+    if any(f.startswith(SVD_PREFIX) for f in features):
+        df, _ = add_text_features(df, build_id=text_build, refresh=refresh)
+    return df
+
 def make_tips(df):
     tips = []
 
@@ -129,15 +139,14 @@ def make_tips(df):
 
     return tips
 
-def save_predictions(df, linear_model, logistic_model, cat_func):
+def save_predictions(df, regressor, classifier, cat_func, features=FEATURES):
     conn = connect()
     cur = conn.cursor()
     
-    features = ['stars', 'price_num', 'avg_sentiment', 'service_mentions', 'avg_price']
     X = df[features]
     
-    tip_pcts = linear_model.predict(X)
-    tip_cats = logistic_model.predict(X)
+    tip_pcts = regressor.predict(X)
+    tip_cats = classifier.predict(X)
     
     print("\nSaving predictions...")
     
@@ -157,36 +166,80 @@ def save_predictions(df, linear_model, logistic_model, cat_func):
     conn.close()
     print(f"Saved {len(df)} predictions")
 
-def connect():
-    conn = psycopg2.connect(
-        dbname="restaurant_tips",
-        user="postgres",
-        password="your_password",
-        host="localhost"
-    )
-    return conn
+def save_models(regressor, classifier, selection=None, features=FEATURES, text_build=None,
+                feature_defaults=None, path=MODEL_PATH):
+    # feature_defaults holds the training-set median of each feature, which
+    # the what-if sweep uses for inputs it has no slider for.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    models = {
+        'regressor': regressor,
+        'classifier': classifier,
+        'features': features,
+        'selection': selection,
+        'text_build': text_build,
+        'feature_defaults': feature_defaults,
+        'trained_at': time.time(),
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(models, f)
+    os.replace(tmp_path, path)
+    print(f"Saved models: {path}")
+
+def load_models(path=MODEL_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train tip models and save predictions")
+    parser.add_argument("--baseline", action="store_true",
+                        help="train only LinearRegression and LogisticRegression, without model selection")
+    parser.add_argument("--text-features", action="store_true", default=USE_TEXT_FEATURES,
+                        help="add the SVD review text embeddings built by text_features.py")
+    parser.add_argument("--slo-ms", type=float, default=LATENCY_SLO_MS,
+                        help="single-row p95 latency budget for model selection")
+    args = parser.parse_args()
+    
     print("\n")
     print("Tip Prediction Model")
     print("\n")
     
     print("\nLoading data...")
     df = get_data()
-    print(f"Loaded {len(df)} restaurants")
+    print(f"Loaded {len(df)} restaurants ({memory_mb(df):.2f} MB)")
     
     df['tip'] = make_tips(df)
     
-    features = ['stars', 'price_num', 'avg_sentiment', 'service_mentions', 'avg_price']
+    features = FEATURES
+    text_build = None
+    if args.text_features:
+        text_build = text_build_id()
+        df, text_columns = add_text_features(df, build_id=text_build)
+        features = FEATURES + text_columns
+        print(f"Added {len(text_columns)} text embedding features (build {text_build})")
+    
     X = df[features]
     y = df['tip']
     
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
-    linear = train_linear(X_train, X_test, y_train, y_test)
-    logistic, cat_func = train_logistic(X_train, X_test, y_train, y_test)
-    
-    save_predictions(df, linear, logistic, cat_func)
+    if args.baseline:
+        regressor = train_linear(X_train, X_test, y_train, y_test)
+        classifier, cat_func = train_logistic(X_train, X_test, y_train, y_test)
+        selection = None
+    else:
+        regressor, classifier, selection = select_models(
+            X_train, X_test, y_train, y_test, to_category, slo_ms=args.slo_ms)
+        cat_func = to_category
+    
+    save_predictions(df, regressor, classifier, cat_func, features)
+    feature_defaults = X_train.median().astype(float).to_dict()
+    save_models(regressor, classifier, selection, features, text_build, feature_defaults)
+    refresh_leaderboards()
+    refresh_listing()
+    publish_snapshot()
     
     show_top()
     
@@ -20,6 +20,7 @@ if __name__ == "__main__":
     print("\n")
     
     scripts = [
+        "migrate.py",
         "data_loader.py",
         "sentiment_analysis.py",
         "prediction_model.py",
@@ -1,8 +1,25 @@
-import psycopg2
+import argparse
+import os
+import time
+import zlib
+
+import numpy as np
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 
+from storage import connect
+from vader_batch import score_batch
+
 vader = SentimentIntensityAnalyzer()
 
+# Unset means exact: every review is scored. Set (e.g. 0.02) to score a
+# random sample per restaurant until the standard error of avg_sentiment is
+# at most this much.
+SENTIMENT_EPSILON = os.environ.get("TIP_SENTIMENT_EPSILON")
+SENTIMENT_EPSILON = float(SENTIMENT_EPSILON) if SENTIMENT_EPSILON else None
+SENTIMENT_MIN_SAMPLE = max(2, int(os.environ.get("TIP_SENTIMENT_MIN_SAMPLE", 30)))
+SAMPLE_GROWTH = 1.5
+CONFIDENCE_Z = 1.96
+
 def has_good_service(text):
     if not text:
         return False
@@ -14,7 +31,7 @@ def has_good_service(text):
             return True
     return False
 
-def analyze_all():
+def analyze_all(epsilon=SENTIMENT_EPSILON):
     conn = connect()
     cur = conn.cursor()
     
@@ -24,11 +41,12 @@ def analyze_all():
     cur.close()
     conn.close()
     
-    print(f"Analyzing {len(restaurant_ids)} restaurants...")
+    mode = "exact" if epsilon is None else f"sampled, epsilon {epsilon:g}"
+    print(f"Analyzing {len(restaurant_ids)} restaurants ({mode})...")
     
     count = 0
     for rest_id in restaurant_ids:
-        result = process_restaurant(rest_id)
+        result = process_restaurant(rest_id, epsilon)
         if result:
             count += 1
             if count % 100 == 0:
@@ -36,10 +54,59 @@ def analyze_all():
     
     print(f"Done! Analyzed {count} restaurants")
 
-def process_restaurant(restaurant_id):
-    conn = connect()
-    cur = conn.cursor()
-    
+FEATURES_UPSERT = """
+    INSERT INTO restaurant_features 
+        (restaurant_id, avg_sentiment, positive_reviews, negative_reviews, 
+        service_mentions, avg_price,
+        sentiment_sample_size, sentiment_ci_low, sentiment_ci_high)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (restaurant_id) DO UPDATE
+    SET avg_sentiment    = EXCLUDED.avg_sentiment,
+        positive_reviews = EXCLUDED.positive_reviews,
+        negative_reviews = EXCLUDED.negative_reviews,
+        service_mentions = EXCLUDED.service_mentions,
+        avg_price        = EXCLUDED.avg_price,
+        sentiment_sample_size = EXCLUDED.sentiment_sample_size,
+        sentiment_ci_low      = EXCLUDED.sentiment_ci_low,
+        sentiment_ci_high     = EXCLUDED.sentiment_ci_high
+"""
+
+def standard_error(scores, population):
+    # Standard error of the sample mean, with the finite-population
+    # correction since the sample is drawn without replacement.
+    m = len(scores)
+    if m < 2:
+        return float("inf")
+    fpc = (population - m) / (population - 1)
+    return float(scores.std(ddof=1) / np.sqrt(m) * np.sqrt(fpc))
+
+def sample_sentiment(texts, epsilon, seed, min_sample=SENTIMENT_MIN_SAMPLE):
+    # Scores a growing prefix of a random permutation of the reviews until
+    # the standard error is at most epsilon. Returns the mean, the sample
+    # size and the confidence interval; the last three are None when every
+    # review ended up scored.
+    n = len(texts)
+    order = np.random.default_rng(seed).permutation(n)
+    m = min(n, min_sample)
+    scores = score_batch([texts[i] for i in order[:m]])
+
+    while m < n and standard_error(scores, n) > epsilon:
+        # Jump straight to the size the current variance says is needed,
+        # but at least SAMPLE_GROWTH times larger so a low early variance
+        # estimate cannot make it crawl.
+        n0 = (scores.std(ddof=1) / epsilon) ** 2
+        needed = int(np.ceil(n0 / (1 + n0 / n)))
+        grow_to = min(n, max(needed, int(m * SAMPLE_GROWTH), m + 1))
+        scores = np.concatenate([scores, score_batch([texts[i] for i in order[m:grow_to]])])
+        m = grow_to
+
+    mean = float(scores.mean())
+    if m == n:
+        return mean, None, None, None
+    half = CONFIDENCE_Z * standard_error(scores, n)
+    return mean, m, max(-1.0, mean - half), min(1.0, mean + half)
+
+def compute_features(cur, restaurant_id, epsilon=SENTIMENT_EPSILON):
     cur.execute("""
         SELECT review_text, stars FROM reviews 
         WHERE restaurant_id = %s
@@ -47,19 +114,23 @@ def process_restaurant(restaurant_id):
     reviews = cur.fetchall()
     
     if len(reviews) == 0:
-        cur.close()
-        conn.close()
         return None
     
-    sentiments = []
+    # Star counts and service mentions stay exact; only VADER, which is most
+    # of the cost, is sampled.
+    texts = [text for text, _ in reviews]
+    if epsilon is None or len(texts) <= SENTIMENT_MIN_SAMPLE:
+        avg_sentiment = float(score_batch(texts).mean())
+        sample_size = ci_low = ci_high = None
+    else:
+        seed = zlib.crc32(str(restaurant_id).encode())
+        avg_sentiment, sample_size, ci_low, ci_high = sample_sentiment(texts, epsilon, seed)
+    
     positive = 0
     negative = 0
     service = 0
     
     for text, stars in reviews:
-        sent = analyze_sentiment(text)
-        sentiments.append(sent)
-        
         if stars >= 4:
             positive += 1
         if stars <= 2:
@@ -68,38 +139,94 @@ def process_restaurant(restaurant_id):
         if has_good_service(text):
             service += 1
     
-    avg_sentiment = sum(sentiments) / len(sentiments)
-    
     cur.execute("""
         SELECT AVG(price) FROM menu_items 
         WHERE restaurant_id = %s
     """, (restaurant_id,))
     avg_price = cur.fetchone()[0] or 0
     
-    cur.execute("""
-        INSERT INTO restaurant_features 
-            (restaurant_id, avg_sentiment, positive_reviews, negative_reviews, 
-            service_mentions, avg_price)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON CONFLICT (restaurant_id) DO UPDATE
-        SET avg_sentiment    = EXCLUDED.avg_sentiment,
-            positive_reviews = EXCLUDED.positive_reviews,
-            negative_reviews = EXCLUDED.negative_reviews,
-            service_mentions = EXCLUDED.service_mentions,
-            avg_price        = EXCLUDED.avg_price
-    """, (restaurant_id, avg_sentiment, positive, negative, service, avg_price))
+    return (avg_sentiment, positive, negative, service, avg_price,
+            sample_size, ci_low, ci_high)
 
+def process_restaurant(restaurant_id, epsilon=SENTIMENT_EPSILON):
+    conn = connect()
+    cur = conn.cursor()
+    
+    features = compute_features(cur, restaurant_id, epsilon)
+    if features is None:
+        cur.close()
+        conn.close()
+        return None
+    
+    cur.execute(FEATURES_UPSERT, (restaurant_id, *features))
     
     conn.commit()
     cur.close()
     conn.close()
     
+    avg_sentiment, positive, _, service = features[:4]
     return {
         'sentiment': avg_sentiment,
         'positive': positive,
         'service': service
     }
 
+def add_reviews(cur, reviews):
+    # Folds newly inserted (restaurant_id, text, stars) rows into
+    # restaurant_features without rescoring older reviews. Must run in the
+    # transaction that inserted them, before review_count is bumped, since
+    # review_count is taken as the number of reviews already averaged in.
+    if not reviews:
+        return []
+    
+    sentiments = score_batch([text for _, text, _ in reviews])
+    batch = {}
+    for (rest_id, text, stars), sent in zip(reviews, sentiments):
+        counts = batch.setdefault(rest_id, [0, 0.0, 0, 0, 0])
+        counts[0] += 1
+        counts[1] += sent
+        counts[2] += stars >= 4
+        counts[3] += stars <= 2
+        counts[4] += has_good_service(text)
+    
+    ids = list(batch)
+    placeholders = ", ".join(["%s"] * len(ids))
+    cur.execute(f"""
+        SELECT r.restaurant_id, r.review_count, f.avg_sentiment,
+               f.positive_reviews, f.negative_reviews, f.service_mentions, f.avg_price,
+               f.sentiment_sample_size, f.sentiment_ci_low, f.sentiment_ci_high
+        FROM restaurants r
+        LEFT JOIN restaurant_features f ON r.restaurant_id = f.restaurant_id
+        WHERE r.restaurant_id IN ({placeholders})
+    """, ids)
+    
+    rows = []
+    for (rest_id, old_count, avg_sent, positive, negative, service, avg_price,
+         sample_size, ci_low, ci_high) in cur.fetchall():
+        new_count, sent_sum, new_pos, new_neg, new_service = batch[rest_id]
+        if avg_sent is None or not old_count:
+            features = compute_features(cur, rest_id)
+        else:
+            weight = old_count / (old_count + new_count)
+            avg_sentiment = float(avg_sent) * weight + sent_sum / (old_count + new_count)
+            # The new reviews are scored exactly, so a sampled estimate keeps
+            # its error only on the old reviews' share of the mean.
+            if sample_size is not None:
+                ci_low = avg_sentiment - (float(avg_sent) - float(ci_low)) * weight
+                ci_high = avg_sentiment + (float(ci_high) - float(avg_sent)) * weight
+                sample_size += new_count
+            features = (avg_sentiment, positive + new_pos, negative + new_neg,
+                        service + new_service, avg_price, sample_size, ci_low, ci_high)
+        rows.append((rest_id, *features))
+    
+    cur.executemany(FEATURES_UPSERT, rows)
+    cur.executemany("""
+        UPDATE restaurants SET review_count = review_count + %s
+        WHERE restaurant_id = %s
+    """, [(batch[rest_id][0], rest_id) for rest_id in ids])
+    
+    return ids
+
 def show_results():
     conn = connect()
     cur = conn.cursor()
@@ -125,17 +252,70 @@ def analyze_sentiment(text):
     scores = vader.polarity_scores(text)
     return scores['compound']
 
-def connect():
-    conn = psycopg2.connect(
-        dbname="restaurant_tips",
-        user="postgres",
-        password="your_password",
-        host="localhost"
-    )
-    return conn
+
+def benchmark(epsilon, min_reviews):
+    # Exact and sampled scoring over the same review texts, so database time
+    # is left out of both.
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT restaurant_id, review_text FROM reviews
+        WHERE restaurant_id IN (
+            SELECT restaurant_id FROM reviews
+            GROUP BY restaurant_id HAVING COUNT(*) >= %s
+        )
+    """, (min_reviews,))
+    by_restaurant = {}
+    for rest_id, text in cur.fetchall():
+        by_restaurant.setdefault(rest_id, []).append(text)
+    cur.close()
+    conn.close()
+    
+    if not by_restaurant:
+        print(f"No restaurants with at least {min_reviews} reviews")
+        return None
+    
+    exact_s = sampled_s = 0.0
+    rows = []
+    for rest_id, texts in by_restaurant.items():
+        start = time.perf_counter()
+        exact = float(score_batch(texts).mean())
+        exact_s += time.perf_counter() - start
+        
+        start = time.perf_counter()
+        seed = zlib.crc32(str(rest_id).encode())
+        approx, sample_size, ci_low, ci_high = sample_sentiment(texts, epsilon, seed)
+        sampled_s += time.perf_counter() - start
+        
+        covered = sample_size is None or ci_low <= exact <= ci_high
+        rows.append((len(texts), sample_size or len(texts), abs(approx - exact), covered))
+    
+    reviews, scored, errors, covered = (np.array(col) for col in zip(*rows))
+    print(f"\n{len(rows):,} restaurants with at least {min_reviews} reviews "
+          f"({reviews.sum():,} reviews), epsilon {epsilon:g}")
+    print(f"  exact:    {exact_s:8.2f} s")
+    print(f"  sampled:  {sampled_s:8.2f} s ({exact_s / max(sampled_s, 1e-9):.1f}x faster), "
+          f"{scored.sum() / reviews.sum():.1%} of reviews scored")
+    print(f"  avg_sentiment error: mean {errors.mean():.4f}, p95 {np.percentile(errors, 95):.4f}, "
+          f"max {errors.max():.4f}")
+    print(f"  exact value inside the {CONFIDENCE_Z:g}-sigma interval: {covered.mean():.1%}")
+    return exact_s / max(sampled_s, 1e-9)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score review sentiment into restaurant_features")
+    parser.add_argument("--epsilon", type=float, default=SENTIMENT_EPSILON,
+                        help="sample until the standard error of avg_sentiment is at most this "
+                             "(default TIP_SENTIMENT_EPSILON; unset scores every review)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="compare exact and sampled scoring without writing anything")
+    parser.add_argument("--min-reviews", type=int, default=200,
+                        help="restaurants included in --benchmark")
+    args = parser.parse_args()
+    
     print("Sentiment Analysis")
     
-    analyze_all()
-    show_results()
+    if args.benchmark:
+        benchmark(args.epsilon or 0.02, args.min_reviews)
+    else:
+        analyze_all(args.epsilon)
+        show_results()
@@ -0,0 +1,193 @@
+import json
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from storage import connect, read_sql
+
+SNAPSHOT_PATH = os.environ.get("TIP_SNAPSHOT_PATH", "restaurant_snapshot.arrow")
+SNAPSHOT_MAX_AGE = float(os.environ.get("TIP_SNAPSHOT_MAX_AGE", 24 * 3600))
+FRESHNESS_TTL = 30
+
+SNAPSHOT_QUERY = """
+    SELECT
+        r.restaurant_id,
+        r.name,
+        r.city,
+        r.lat,
+        r.lon,
+        r.stars,
+        r.price_range,
+        f.avg_sentiment,
+        f.positive_reviews,
+        f.negative_reviews,
+        f.service_mentions,
+        f.avg_price,
+        t.predicted_tip_pct,
+        t.tip_category
+    FROM restaurants r
+    JOIN restaurant_features f ON r.restaurant_id = f.restaurant_id
+    JOIN tip_predictions t ON r.restaurant_id = t.restaurant_id
+    ORDER BY r.city, t.predicted_tip_pct DESC
+"""
+
+# Row counts plus sums of every feature and prediction column. All of them
+# are DECIMAL, so the sums are exact and any rewrite of the values (a
+# sentiment rerun, job queue workers on other hosts, retraining) changes
+# the version even when the row count stays the same. The restaurant columns
+# the snapshot carries (names, coordinates from geocode.py, stars) are mixed
+# types, so they get an md5 over the rows in key order instead.
+DATA_VERSION_QUERY = """
+    SELECT r.n, r.checksum,
+           f.n, f.sentiment, f.positive, f.negative, f.service, f.price, t.n, t.tip, t.high
+    FROM (
+        SELECT COUNT(*) AS n,
+               md5(string_agg(concat_ws('|', restaurant_id, name, city, lat, lon,
+                                        stars, price_range),
+                              ',' ORDER BY restaurant_id)) AS checksum
+        FROM restaurants
+    ) r
+    CROSS JOIN (
+        SELECT COUNT(*) AS n,
+               SUM(avg_sentiment) AS sentiment,
+               SUM(positive_reviews) AS positive,
+               SUM(negative_reviews) AS negative,
+               SUM(service_mentions) AS service,
+               SUM(avg_price) AS price
+        FROM restaurant_features
+    ) f
+    CROSS JOIN (
+        SELECT COUNT(*) AS n,
+               SUM(predicted_tip_pct) AS tip,
+               SUM(CASE WHEN tip_category = 'high' THEN 1 ELSE 0 END) AS high
+        FROM tip_predictions
+    ) t
+"""
+
+SCHEMA = pa.schema([
+    ("restaurant_id", pa.string()),
+    ("name", pa.string()),
+    ("city", pa.string()),
+    ("lat", pa.float64()),
+    ("lon", pa.float64()),
+    ("stars", pa.float64()),
+    ("price_range", pa.string()),
+    ("avg_sentiment", pa.float64()),
+    ("positive_reviews", pa.int64()),
+    ("negative_reviews", pa.int64()),
+    ("service_mentions", pa.int64()),
+    ("avg_price", pa.float64()),
+    ("predicted_tip_pct", pa.float64()),
+    ("tip_category", pa.string()),
+])
+
+_reader = {"path": None, "mtime": None, "reader": None, "meta": None}
+_fresh = {"path": None, "mtime": None, "checked_at": 0.0, "fresh": False}
+
+def data_version(conn):
+    cur = conn.cursor()
+    cur.execute(DATA_VERSION_QUERY)
+    version = "|".join(str(v) for v in cur.fetchone())
+    cur.close()
+    conn.commit()
+    return version
+
+def publish_snapshot(path=SNAPSHOT_PATH):
+    # The version is read before the rows, so a write in between leaves the
+    # snapshot looking stale rather than looking fresh with old rows.
+    conn = connect()
+    version = data_version(conn)
+    df = read_sql(SNAPSHOT_QUERY, conn)
+    conn.close()
+
+    for field in SCHEMA:
+        if pa.types.is_floating(field.type):
+            df[field.name] = pd.to_numeric(df[field.name]).astype("float64")
+        elif pa.types.is_integer(field.type):
+            df[field.name] = pd.to_numeric(df[field.name]).fillna(0).astype("int64")
+
+    # One record batch per city, so a city lookup reads a single batch out of
+    # the memory map instead of filtering the whole file.
+    cities = {}
+    batches = []
+    for city, group in df.groupby("city", sort=True):
+        cities[city] = len(batches)
+        batches.append(pa.RecordBatch.from_pandas(group, schema=SCHEMA, preserve_index=False))
+
+    meta = {"created_at": time.time(), "row_count": len(df), "cities": cities,
+            "data_version": version}
+    schema = SCHEMA.with_metadata({"snapshot": json.dumps(meta)})
+
+    tmp_path = path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+    os.replace(tmp_path, path)
+
+    print(f"Saved snapshot: {path} ({len(df):,} restaurants, {len(cities)} cities)")
+    return meta
+
+def open_snapshot(path=SNAPSHOT_PATH):
+    if not os.path.exists(path):
+        return None, None
+
+    mtime = os.path.getmtime(path)
+    if _reader["path"] != path or _reader["mtime"] != mtime:
+        reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+        _reader.update(path=path, mtime=mtime, reader=reader,
+                       meta=json.loads(reader.schema.metadata[b"snapshot"]))
+    return _reader["reader"], _reader["meta"]
+
+def is_fresh(path=SNAPSHOT_PATH):
+    reader, meta = open_snapshot(path)
+    if reader is None or reader.schema.names != SCHEMA.names:
+        return False
+    if time.time() - meta["created_at"] > SNAPSHOT_MAX_AGE:
+        return False
+
+    # Comparing against the live data version catches any writer, on any
+    # host; the result is reused for FRESHNESS_TTL seconds so page renders
+    # do not pay for it every time.
+    now = time.time()
+    if (_fresh["path"] == path and _fresh["mtime"] == _reader["mtime"]
+            and now - _fresh["checked_at"] < FRESHNESS_TTL):
+        return _fresh["fresh"]
+
+    try:
+        conn = connect()
+        version = data_version(conn)
+        conn.close()
+    except Exception:
+        return False
+
+    fresh = version == meta.get("data_version")
+    _fresh.update(path=path, mtime=_reader["mtime"], checked_at=now, fresh=fresh)
+    return fresh
+
+def load_table(city=None, columns=None, path=SNAPSHOT_PATH):
+    if not is_fresh(path):
+        return None
+
+    reader, meta = open_snapshot(path)
+    if city is not None:
+        if city not in meta["cities"]:
+            return pa.Table.from_batches([], schema=SCHEMA).select(columns or SCHEMA.names)
+        table = pa.Table.from_batches([reader.get_batch(meta["cities"][city])])
+    else:
+        table = reader.read_all()
+
+    if columns:
+        table = table.select(columns)
+    return table
+
+def load_frame(city=None, columns=None, path=SNAPSHOT_PATH):
+    table = load_table(city=city, columns=columns, path=path)
+    if table is None:
+        return None
+    return table.to_pandas()
+
+if __name__ == "__main__":
+    publish_snapshot()
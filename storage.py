@@ -0,0 +1,206 @@
+import argparse
+import os
+import re
+import threading
+
+import pandas as pd
+
+BACKEND = os.environ.get("TIP_BACKEND", "postgres")
+DUCKDB_PATH = os.environ.get("TIP_DUCKDB_PATH", "restaurant_tips.duckdb")
+
+TABLES = ["restaurants", "reviews", "menu_items", "restaurant_features", "tip_predictions",
+          "restaurant_listing"]
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+
+def _translate(query):
+    def repl(m):
+        if m.group(0) == "%%":
+            return "%"
+        if m.group(1):
+            return "$" + m.group(1)
+        return "?"
+    return _PLACEHOLDER.sub(repl, query)
+
+def postgres_params():
+    # Shared by psycopg2 here and the psycopg3 pool in async_queries.py.
+    return {
+        "dbname": os.environ.get("PGDATABASE", "restaurant_tips"),
+        "user": os.environ.get("PGUSER", "postgres"),
+        "password": os.environ.get("PGPASSWORD", "your_password"),
+        "host": os.environ.get("PGHOST", "localhost"),
+        "port": os.environ.get("PGPORT", "5432"),
+    }
+
+class PostgresBackend:
+    name = "postgres"
+    migrations_subdir = ""
+
+    def connect(self):
+        import psycopg2
+
+        return psycopg2.connect(**postgres_params())
+
+    def read_sql(self, query, conn, params=None):
+        return pd.read_sql(query, conn, params=params)
+
+class DuckDBCursor:
+    # psycopg2-style cursor over a DuckDB connection: translates %s and
+    # %(name)s placeholders and opens a transaction on first use so the
+    # modules' commit()/rollback() calls mean the same thing on both backends.
+    def __init__(self, conn):
+        self.connection = conn
+        self._con = conn._con
+
+    @property
+    def description(self):
+        return self._con.description
+
+    def execute(self, query, params=None):
+        self.connection._begin()
+        if params is None:
+            self._con.execute(query)
+        else:
+            self._con.execute(_translate(query), params)
+        return self
+
+    def executemany(self, query, seq_of_params):
+        self.connection._begin()
+        self._con.executemany(_translate(query), seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self._con.fetchone()
+
+    def fetchmany(self, size=1):
+        return self._con.fetchmany(size)
+
+    def fetchall(self):
+        return self._con.fetchall()
+
+    def df(self):
+        return self._con.df()
+
+    def close(self):
+        pass
+
+class DuckDBConnection:
+    def __init__(self, con):
+        self._con = con
+        self._in_tx = False
+        self.autocommit = False
+
+    def _begin(self):
+        if not self.autocommit and not self._in_tx:
+            self._con.begin()
+            self._in_tx = True
+
+    def cursor(self):
+        return DuckDBCursor(self)
+
+    def commit(self):
+        if self._in_tx:
+            self._con.commit()
+            self._in_tx = False
+
+    def rollback(self):
+        if self._in_tx:
+            self._con.rollback()
+            self._in_tx = False
+
+    def close(self):
+        self.rollback()
+        self._con.close()
+
+class DuckDBBackend:
+    name = "duckdb"
+    migrations_subdir = "duckdb"
+
+    def __init__(self, path):
+        self.path = path
+        self._db = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        import duckdb
+
+        with self._lock:
+            if self._db is None:
+                self._db = duckdb.connect(self.path)
+            return DuckDBConnection(self._db.cursor())
+
+    def read_sql(self, query, conn, params=None):
+        cur = conn.cursor()
+        cur.execute(query, params)
+        df = cur.df()
+        conn.commit()
+        return df
+
+_backends = {}
+_connects = {"count": 0}
+_connects_lock = threading.Lock()
+
+def get_backend(name=None):
+    name = name or BACKEND
+    if name not in _backends:
+        if name == "postgres":
+            _backends[name] = PostgresBackend()
+        elif name == "duckdb":
+            _backends[name] = DuckDBBackend(DUCKDB_PATH)
+        else:
+            raise ValueError(f"Unknown storage backend: {name} (expected postgres or duckdb)")
+    return _backends[name]
+
+def connect(backend=None):
+    with _connects_lock:
+        _connects["count"] += 1
+    return get_backend(backend).connect()
+
+def connections_opened():
+    # Connections opened through connect() by this process; load_test.py
+    # diffs it to count connections per page load.
+    return _connects["count"]
+
+def read_sql(query, conn, params=None, backend=None):
+    return get_backend(backend).read_sql(query, conn, params=params)
+
+def copy_tables(source, target, tables=TABLES):
+    src = connect(source)
+    dst = connect(target)
+    cur = dst.cursor()
+
+    for table in reversed(tables):
+        cur.execute(f"DELETE FROM {table}")
+
+    for table in tables:
+        df = read_sql(f"SELECT * FROM {table}", src, backend=source)
+        if table == "menu_items":
+            df = df.drop(columns=["item_id"])
+        columns = ", ".join(df.columns)
+        if len(df) and isinstance(dst, DuckDBConnection):
+            dst._con.register("copy_source", df)
+            cur.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM copy_source")
+            dst._con.unregister("copy_source")
+        elif len(df):
+            placeholders = ", ".join(["%s"] * len(df.columns))
+            rows = [tuple(None if pd.isna(v) else v for v in row)
+                    for row in df.itertuples(index=False)]
+            cur.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", rows)
+        print(f"  Copied {len(df):,} rows into {table}")
+
+    dst.commit()
+    cur.close()
+    dst.close()
+    src.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Storage backend utilities")
+    parser.add_argument("--copy", nargs=2, metavar=("SOURCE", "TARGET"),
+                        help="copy all pipeline tables between backends, e.g. --copy postgres duckdb")
+    args = parser.parse_args()
+
+    if args.copy:
+        print(f"Copying tables from {args.copy[0]} to {args.copy[1]}...")
+        copy_tables(*args.copy)
+    else:
+        print(f"Active backend: {get_backend().name}")
@@ -0,0 +1,114 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from prediction_model import MODEL_PATH, load_models
+
+# Simulator inputs: label, low, high, integer-valued. The model feature each
+# one feeds is given by INPUT_FEATURES.
+INPUTS = {
+    "stars": ("Star Rating", 1.0, 5.0, False),
+    "sentiment": ("Sentiment Score", -1.0, 1.0, False),
+    "service_mentions": ("Service Mentions", 0, 20, True),
+    "avg_price": ("Average Price", 5.0, 40.0, False),
+}
+INPUT_FEATURES = {
+    "stars": "stars",
+    "sentiment": "avg_sentiment",
+    "service_mentions": "service_mentions",
+    "avg_price": "avg_price",
+}
+
+GRID_POINTS = 41
+DEFAULT_PRICE_NUM = 2
+
+def heuristic_tip(stars, sentiment, service_mentions, avg_price):
+    tip = 13.5 + np.asarray(sentiment, dtype=float) * 4.0
+    tip = tip + (np.asarray(stars, dtype=float) - 3.0) * 1.0
+    tip = tip + np.minimum(service_mentions, 6) * 0.2
+    tip = tip + np.where(np.asarray(avg_price) > 25, 0.6, 0.0)
+    tip = tip - np.where(np.asarray(avg_price) < 10, 0.6, 0.0)
+    return np.clip(tip, 10, 22)
+
+def model_version(path=MODEL_PATH):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+def feature_frame(inputs, features, defaults=None):
+    # Features the simulator has no slider for (price level, text embeddings)
+    # are held at their training-set medians. Models saved without them fall
+    # back to the $$ price level and zero.
+    n = len(next(iter(inputs.values())))
+    values = {"price_num": DEFAULT_PRICE_NUM, **(defaults or {})}
+    values.update({INPUT_FEATURES[name]: np.asarray(v, dtype=np.float32)
+                   for name, v in inputs.items()})
+
+    return pd.DataFrame({
+        f: np.broadcast_to(np.asarray(values.get(f, 0.0), dtype=np.float32), n)
+        for f in features
+    })
+
+def predict(inputs, models=None):
+    if models is None:
+        return heuristic_tip(**inputs)
+    return models["regressor"].predict(
+        feature_frame(inputs, models["features"], models.get("feature_defaults")))
+
+def axis_values(name, points=GRID_POINTS):
+    _, lo, hi, integer = INPUTS[name]
+    if integer:
+        return np.arange(lo, hi + 1, dtype=float)
+    return np.linspace(lo, hi, points)
+
+def sweep(x_name, y_name, fixed, models=None, points=GRID_POINTS):
+    # One batched prediction over the x-by-y grid; every other input is held
+    # at its value in `fixed`. Returns the axes and a (len(y), len(x)) surface.
+    if x_name == y_name:
+        raise ValueError("Sweep needs two different inputs")
+
+    xs, ys = axis_values(x_name, points), axis_values(y_name, points)
+    grid_x, grid_y = np.meshgrid(xs, ys)
+
+    inputs = {name: np.full(grid_x.size, float(fixed[name]))
+              for name in INPUTS if name not in (x_name, y_name)}
+    inputs[x_name] = grid_x.ravel()
+    inputs[y_name] = grid_y.ravel()
+
+    surface = np.asarray(predict(inputs, models), dtype=float).reshape(grid_x.shape)
+    return xs, ys, surface
+
+def predict_one(values, models=None):
+    inputs = {name: np.array([float(values[name])]) for name in INPUTS}
+    return float(predict(inputs, models)[0])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time a batched what-if sweep against per-point calls")
+    parser.add_argument("--x", choices=list(INPUTS), default="stars")
+    parser.add_argument("--y", choices=list(INPUTS), default="sentiment")
+    parser.add_argument("--points", type=int, default=GRID_POINTS)
+    parser.add_argument("--heuristic", action="store_true", help="ignore the saved model")
+    args = parser.parse_args()
+
+    models = None if args.heuristic else load_models()
+    fixed = {"stars": 4.0, "sentiment": 0.3, "service_mentions": 3, "avg_price": 18.0}
+    print(f"Model: {'heuristic' if models is None else model_version()}")
+
+    start = time.perf_counter()
+    xs, ys, surface = sweep(args.x, args.y, fixed, models, args.points)
+    batched_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for y in ys:
+        for x in xs:
+            predict_one({**fixed, args.x: x, args.y: y}, models)
+    loop_s = time.perf_counter() - start
+
+    print(f"Grid: {len(xs)} x {len(ys)} = {surface.size:,} points")
+    print(f"Batched sweep:   {batched_s * 1000:8.1f} ms")
+    print(f"Point-by-point:  {loop_s * 1000:8.1f} ms ({loop_s / batched_s:.0f}x slower)")
+    print(f"Tip range: {surface.min():.2f}% to {surface.max():.2f}%")
@@ -0,0 +1,198 @@
+import argparse
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from storage import connect
+from typed_frames import iter_rows
+
+N_FEATURES = int(os.environ.get("TIP_TEXT_HASH_FEATURES", 2 ** 18))
+SVD_COMPONENTS = int(os.environ.get("TIP_TEXT_SVD_COMPONENTS", 32))
+CHUNK_REVIEWS = int(os.environ.get("TIP_TEXT_CHUNK_REVIEWS", 20000))
+FEATURES_DIR = os.environ.get("TIP_FEATURES_DIR", "features")
+
+MEANS_PATH = os.path.join(FEATURES_DIR, "text_means.npz")
+SVD_PATH = os.path.join(FEATURES_DIR, "text_svd.npz")
+SVD_PREFIX = "text_svd_"
+
+def make_vectorizer(n_features=N_FEATURES):
+    # Stateless, so every chunk (and every later run) hashes into the same
+    # columns without a fitted vocabulary.
+    return HashingVectorizer(
+        n_features=n_features,
+        ngram_range=(1, 2),
+        alternate_sign=False,
+        norm="l2",
+        dtype=np.float32,
+    )
+
+def restaurant_index():
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT restaurant_id FROM restaurants ORDER BY restaurant_id")
+    ids = [row[0] for row in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return ids
+
+def aggregate_reviews(restaurant_ids, n_features=N_FEATURES, chunksize=CHUNK_REVIEWS,
+                      query="SELECT restaurant_id, review_text FROM reviews", params=None,
+                      progress=True):
+    # Each chunk of reviews is hashed and immediately summed into its
+    # restaurants' rows (indicator^T @ chunk), so memory holds one chunk plus
+    # the per-restaurant sums, never the review-by-feature matrix.
+    vectorizer = make_vectorizer(n_features)
+    index = {rest_id: i for i, rest_id in enumerate(restaurant_ids)}
+    n_rest = len(restaurant_ids)
+
+    sums = sparse.csr_matrix((n_rest, n_features), dtype=np.float32)
+    counts = np.zeros(n_rest, dtype=np.int64)
+    processed = 0
+
+    for _, rows in iter_rows(query, params, chunksize=chunksize):
+        rows = [(index[rest_id], text or "") for rest_id, text in rows if rest_id in index]
+        if not rows:
+            continue
+        owners = np.fromiter((r for r, _ in rows), dtype=np.int64, count=len(rows))
+        hashed = vectorizer.transform([text for _, text in rows])
+
+        indicator = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (owners, np.arange(len(rows)))),
+            shape=(n_rest, len(rows)),
+        )
+        sums = sums + indicator @ hashed
+        counts += np.bincount(owners, minlength=n_rest)
+        processed += len(rows)
+        if progress:
+            print(f"  Hashed {processed:,} reviews...")
+
+    scale = sparse.diags(1.0 / np.maximum(counts, 1)).astype(np.float32)
+    means = (scale @ sums).tocsr()
+    means.eliminate_zeros()
+    return means, counts, processed
+
+def save_means(path, means, restaurant_ids, counts):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(
+        path,
+        data=means.data, indices=means.indices, indptr=means.indptr,
+        shape=np.array(means.shape), restaurant_ids=np.array(restaurant_ids),
+        review_counts=counts,
+    )
+
+def load_means(path=MEANS_PATH):
+    with np.load(path, allow_pickle=False) as f:
+        means = sparse.csr_matrix((f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"]))
+        return means, f["restaurant_ids"].tolist()
+
+def reduce_svd(means, n_components=SVD_COMPONENTS):
+    n_components = min(n_components, min(means.shape) - 1)
+    svd = TruncatedSVD(n_components=n_components, random_state=42)
+    embeddings = svd.fit_transform(means).astype(np.float32)
+    return embeddings, svd.components_.astype(np.float32), float(svd.explained_variance_ratio_.sum())
+
+def save_svd(path, embeddings, components, restaurant_ids):
+    # Hash columns no review hit have all-zero components; only the used
+    # columns are stored. The build id is a digest of the components, so a
+    # rebuild that lands on the same axes keeps its id.
+    used = np.flatnonzero(np.any(components != 0, axis=0))
+    build_id = hashlib.sha1(components.tobytes()).hexdigest()[:12]
+    np.savez_compressed(
+        path,
+        embeddings=embeddings, restaurant_ids=np.array(restaurant_ids),
+        components=components[:, used], component_columns=used,
+        n_features=np.array(components.shape[1]), build_id=np.array(build_id),
+    )
+    return build_id
+
+def text_build_id(path=SVD_PATH):
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as f:
+        return str(f["build_id"]) if "build_id" in f else None
+
+def project_restaurants(restaurant_ids, components, columns, n_features):
+    # Embeds restaurants the build did not cover (for example ones ingested
+    # since) with the saved components, i.e. TruncatedSVD.transform on their
+    # mean review vectors.
+    placeholders = ", ".join(["%s"] * len(restaurant_ids))
+    means, counts, _ = aggregate_reviews(
+        restaurant_ids, n_features,
+        query=f"SELECT restaurant_id, review_text FROM reviews WHERE restaurant_id IN ({placeholders})",
+        params=list(restaurant_ids), progress=False,
+    )
+    embeddings = np.asarray(means[:, columns] @ components.T, dtype=np.float32)
+    return embeddings, counts > 0
+
+def build_text_features(n_features=N_FEATURES, n_components=SVD_COMPONENTS,
+                        chunksize=CHUNK_REVIEWS):
+    start = time.time()
+    restaurant_ids = restaurant_index()
+    means, counts, processed = aggregate_reviews(restaurant_ids, n_features, chunksize)
+    hashed_s = time.time() - start
+
+    save_means(MEANS_PATH, means, restaurant_ids, counts)
+
+    embeddings, components, explained = reduce_svd(means, n_components)
+    build_id = save_svd(SVD_PATH, embeddings, components, restaurant_ids)
+
+    print(f"Hashed {processed:,} reviews in {hashed_s:.1f}s "
+          f"({processed / max(hashed_s, 1e-9):,.0f} reviews/s)")
+    print(f"Mean vectors: {means.shape[0]:,} x {means.shape[1]:,}, {means.nnz:,} non-zeros, "
+          f"{os.path.getsize(MEANS_PATH) / 1024 ** 2:.2f} MB on disk ({MEANS_PATH})")
+    print(f"SVD embeddings: {embeddings.shape[1]} components, "
+          f"{explained:.1%} variance explained ({SVD_PATH}, build {build_id})")
+    print("Retrain with prediction_model.py --text-features to use this build")
+
+def add_text_features(df, path=SVD_PATH, build_id=None, refresh=()):
+    # Joins the SVD embeddings onto a frame with a restaurant_id column.
+    # build_id is the build a model was trained on; a different build has
+    # different axes, so scoring with it would be meaningless. Restaurants the
+    # build did not cover, and those in refresh (ones with reviews added since
+    # the build), are projected through the saved components from their
+    # current reviews; ones without any reviews get zeros.
+    with np.load(path, allow_pickle=False) as f:
+        file_build = str(f["build_id"]) if "build_id" in f else None
+        if build_id is not None and file_build != build_id:
+            raise ValueError(f"{path} is build {file_build}, but the model was trained on "
+                             f"build {build_id}; retrain with prediction_model.py --text-features")
+        embeddings = f["embeddings"]
+        ids = f["restaurant_ids"].astype(str)
+        projection = None
+        if "components" in f:
+            projection = (f["components"], f["component_columns"], int(f["n_features"]))
+
+    if projection is not None and len(refresh):
+        keep = ~np.isin(ids, [str(rest_id) for rest_id in refresh])
+        embeddings, ids = embeddings[keep], ids[keep]
+
+    missing = sorted(set(df["restaurant_id"].astype(str)) - set(ids))
+    if missing and projection is not None:
+        extra, reviewed = project_restaurants(missing, *projection)
+        embeddings = np.vstack([embeddings, extra[reviewed]])
+        ids = np.concatenate([ids, np.array(missing)[reviewed]])
+
+    columns = [f"{SVD_PREFIX}{i}" for i in range(embeddings.shape[1])]
+    text = pd.DataFrame(embeddings, columns=columns)
+    text["restaurant_id"] = ids
+
+    ids_dtype = df["restaurant_id"].dtype
+    df = df.merge(text.astype({"restaurant_id": ids_dtype}), on="restaurant_id", how="left")
+    df[columns] = df[columns].fillna(0).astype(np.float32)
+    return df, columns
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build hashed per-restaurant review text features")
+    parser.add_argument("--n-features", type=int, default=N_FEATURES, help="hash space width")
+    parser.add_argument("--components", type=int, default=SVD_COMPONENTS, help="SVD dimensions")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_REVIEWS, help="reviews per chunk")
+    args = parser.parse_args()
+
+    print("Text Features")
+    build_text_features(args.n_features, args.components, args.chunk_size)
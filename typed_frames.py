@@ -0,0 +1,163 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from storage import connect, get_backend, read_sql
+
+CHUNK_ROWS = int(os.environ.get("TIP_CHUNK_ROWS", 50000))
+
+ID = "string[pyarrow]"
+TEXT = "string[pyarrow]"
+CITY = "category"
+PRICE = pd.CategoricalDtype(["$", "$$", "$$$", "$$$$"], ordered=True)
+TIP_CATEGORY = pd.CategoricalDtype(["low", "medium", "high"], ordered=True)
+FEATURE = "float32"
+COORD = "float64"
+COUNT = "int32"
+
+NUMERIC = {FEATURE, COORD, COUNT}
+
+FEATURE_SCHEMA = {
+    "restaurant_id": ID,
+    "stars": FEATURE,
+    "price_range": PRICE,
+    "avg_sentiment": FEATURE,
+    "positive_reviews": COUNT,
+    "service_mentions": COUNT,
+    "avg_price": FEATURE,
+}
+
+TIP_SCHEMA = {
+    "predicted_tip_pct": FEATURE,
+    "tip_category": TIP_CATEGORY,
+}
+
+SENTIMENT_SCHEMA = {
+    "avg_sentiment": FEATURE,
+    "predicted_tip_pct": FEATURE,
+    "tip_category": TIP_CATEGORY,
+}
+
+SERVICE_SCHEMA = {
+    "service_mentions": COUNT,
+    "predicted_tip_pct": FEATURE,
+}
+
+CLUSTER_SCHEMA = {
+    "restaurant_id": ID,
+    "name": TEXT,
+    "city": CITY,
+    "stars": FEATURE,
+    "lat": COORD,
+    "lon": COORD,
+    "avg_sentiment": FEATURE,
+    "avg_price": FEATURE,
+    "predicted_tip_pct": FEATURE,
+}
+
+def apply_schema(df, schema):
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if isinstance(dtype, str) and dtype in NUMERIC:
+            values = pd.to_numeric(values, errors="coerce")
+            if dtype == COUNT:
+                values = values.fillna(0)
+        df[col] = values.astype(dtype)
+    return df
+
+def concat_chunks(chunks, columns, schema):
+    if not chunks:
+        return apply_schema(pd.DataFrame(columns=columns), schema)
+    if len(chunks) == 1:
+        return chunks[0]
+
+    # Chunks infer their own categories for open-ended categoricals such as
+    # city; union_categoricals merges them instead of falling back to object.
+    data = {}
+    for col in columns:
+        parts = [chunk[col] for chunk in chunks]
+        if schema.get(col) == "category":
+            data[col] = pd.Series(union_categoricals(parts), name=col)
+        else:
+            data[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(data)
+
+def iter_rows(query, params=None, chunksize=CHUNK_ROWS):
+    # Yields (columns, rows) one chunk at a time. A named cursor keeps the
+    # result on the PostgreSQL server, so only one chunk of Python objects
+    # exists at a time.
+    conn = connect()
+    if get_backend().name == "postgres":
+        cur = conn.cursor(name="typed_frames")
+        cur.itersize = chunksize
+    else:
+        cur = conn.cursor()
+
+    try:
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(chunksize)
+            columns = [col[0] for col in cur.description]
+            yield columns, rows
+            if not rows:
+                break
+    finally:
+        cur.close()
+        conn.commit()
+        conn.close()
+
+def read_typed(query, schema, params=None, chunksize=CHUNK_ROWS):
+    chunks = []
+    for columns, rows in iter_rows(query, params, chunksize):
+        if rows:
+            chunk = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+            chunks.append(apply_schema(chunk, schema))
+    return concat_chunks(chunks, columns, schema)
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+def compare(label, query, schema, params=None):
+    conn = connect()
+    start = time.perf_counter()
+    before = read_sql(query, conn, params=params)
+    default_s = time.perf_counter() - start
+    conn.close()
+
+    start = time.perf_counter()
+    after = read_typed(query, schema, params=params)
+    typed_s = time.perf_counter() - start
+
+    before_mb, after_mb = memory_mb(before), memory_mb(after)
+    print(f"\n{label} ({len(after):,} rows)")
+    print(f"  default dtypes: {before_mb:8.3f} MB  {default_s * 1000:7.1f} ms")
+    print(f"  typed:          {after_mb:8.3f} MB  {typed_s * 1000:7.1f} ms")
+    print(f"  reduction:      {before_mb / max(after_mb, 1e-9):.1f}x")
+    return before_mb / max(after_mb, 1e-9)
+
+if __name__ == "__main__":
+    from prediction_model import FEATURE_QUERY
+
+    parser = argparse.ArgumentParser(description="Compare default and typed DataFrame memory")
+    parser.add_argument("--target", type=float, default=4.0,
+                        help="required reduction on the restaurant feature frame")
+    args = parser.parse_args()
+
+    print(f"Backend: {get_backend().name}")
+    ratio = compare("Restaurant features", FEATURE_QUERY, FEATURE_SCHEMA)
+    compare("Tip predictions", "SELECT predicted_tip_pct, tip_category FROM tip_predictions",
+            TIP_SCHEMA)
+    compare("Restaurant clusters", """
+        SELECT r.restaurant_id, r.name, r.city, r.stars, r.lat, r.lon,
+               f.avg_sentiment, f.avg_price, t.predicted_tip_pct
+        FROM restaurants r
+        JOIN restaurant_features f ON f.restaurant_id = r.restaurant_id
+        JOIN tip_predictions t ON t.restaurant_id = r.restaurant_id
+    """, CLUSTER_SCHEMA)
+
+    print(f"\nFeature frame target {args.target:.1f}x: " + ("PASS" if ratio >= args.target else "FAIL"))
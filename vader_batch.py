@@ -0,0 +1,339 @@
+import argparse
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from vaderSentiment import vaderSentiment as vs
+
+from storage import connect
+
+# Largest |compound| difference from vaderSentiment 3.3.2 accepted by --parity.
+# The batch scorer follows the reference rules step for step, so in practice
+# the only differences come from the final rounding to four decimals.
+PARITY_TOLERANCE = 1e-4
+MAX_VOCABULARY = 2_000_000
+
+# Words the rules look for by name, as small integer codes.
+WORD_CODES = {w: i + 1 for i, w in enumerate([
+    "no", "kind", "of", "but", "never", "so", "this", "without",
+    "doubt", "least", "at", "very", "or", "nor",
+])}
+NO, KIND, OF, BUT, NEVER, SO, THIS, WITHOUT, DOUBT, LEAST, AT, VERY, OR, NOR = range(1, 15)
+
+# Multi-word SPECIAL_CASES idioms and boosters ("kind of", "sort of", ...),
+# matched on integer codes for the words they contain.
+SPECIAL_PHRASES = [(key.split(), value) for key, value in vs.SPECIAL_CASES.items() if " " in key]
+BOOSTER_PHRASES = [(key.split(), value) for key, value in vs.BOOSTER_DICT.items() if " " in key]
+IDIOM_CODES = {w: i + 1 for i, w in enumerate(sorted(
+    {w for words, _ in SPECIAL_PHRASES + BOOSTER_PHRASES for w in words}))}
+
+# Word offsets relative to the scored word, in the order the reference
+# _special_idioms_check tries them.
+IDIOM_SEQUENCES = [(-1, 0), (-2, -1, 0), (-2, -1), (-3, -2, -1), (-3, -2)]
+IDIOM_OVERRIDES = [(0, 1), (0, 1, 2)]
+BOOSTER_SEQUENCES = [(-3, -2, -1), (-3, -2), (-2, -1)]
+
+class _Vocabulary:
+    # Token string -> integer id, with the per-token lexicon properties kept
+    # in arrays indexed by that id.
+    def __init__(self, analyzer):
+        self.lexicon = analyzer.lexicon
+        self.ids = {}
+        self.size = 0
+        self.capacity = 0
+        self.columns = {
+            "in_lex": np.bool_, "valence": np.float64, "booster": np.float64,
+            "is_booster": np.bool_, "upper": np.bool_, "negation": np.bool_,
+            "code": np.int8, "idiom": np.int8,
+        }
+        self.arrays = {name: np.zeros(0, dtype) for name, dtype in self.columns.items()}
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * self.capacity, 1024)
+        for name, dtype in self.columns.items():
+            grown = np.zeros(capacity, dtype)
+            grown[:self.size] = self.arrays[name][:self.size]
+            self.arrays[name] = grown
+        self.capacity = capacity
+
+    def add(self, tokens):
+        new = [t for t in tokens if t not in self.ids]
+        if not new:
+            return
+        if self.size + len(new) > self.capacity:
+            self._grow(self.size + len(new))
+
+        a = self.arrays
+        for token in new:
+            i = self.size
+            word = vs.SentiText._strip_punc_if_word(token)
+            lower = word.lower()
+            self.ids[token] = i
+            a["in_lex"][i] = lower in self.lexicon
+            a["valence"][i] = self.lexicon.get(lower, 0.0)
+            a["booster"][i] = vs.BOOSTER_DICT.get(lower, 0.0)
+            a["is_booster"][i] = lower in vs.BOOSTER_DICT
+            a["upper"][i] = word.isupper()
+            a["negation"][i] = lower in vs.NEGATE or "n't" in lower
+            a["code"][i] = WORD_CODES.get(lower, 0)
+            a["idiom"][i] = IDIOM_CODES.get(lower, 0)
+            self.size += 1
+
+    def lookup(self, tokens):
+        return np.fromiter(map(self.ids.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+
+class BatchSentimentScorer:
+    def __init__(self, analyzer=None):
+        self.analyzer = analyzer or vs.SentimentIntensityAnalyzer()
+        self.vocab = _Vocabulary(self.analyzer)
+        single_char_emojis = [e for e in self.analyzer.emojis if len(e) == 1]
+        self.emoji_re = re.compile("[" + "".join(re.escape(e) for e in single_char_emojis) + "]")
+
+    def _reference(self, text):
+        return self.analyzer.polarity_scores(text)["compound"]
+
+    def score(self, texts):
+        texts = ["" if t is None else str(t) for t in texts]
+        scores = np.zeros(len(texts))
+        if not texts:
+            return scores
+
+        # Emoji are rewritten to words by the reference scorer before
+        # tokenizing; those reviews go through it directly.
+        fallback = np.array([not t.isascii() and self.emoji_re.search(t) is not None
+                             for t in texts], dtype=bool)
+
+        if len(self.vocab.ids) > MAX_VOCABULARY:
+            self.vocab = _Vocabulary(self.analyzer)
+
+        tokens_per_doc = [t.split() for t in texts]
+        lengths = np.fromiter(map(len, tokens_per_doc), dtype=np.int64, count=len(texts))
+        tokens = [tok for doc in tokens_per_doc for tok in doc]
+
+        if tokens:
+            self.vocab.add(set(tokens))
+            ids = self.vocab.lookup(tokens)
+            sums, exact_docs = self._token_sums(ids, lengths)
+            fallback |= exact_docs
+        else:
+            sums = np.zeros(len(texts))
+
+        excl = np.minimum(np.fromiter((t.count("!") for t in texts), np.int64, len(texts)), 4) * 0.292
+        qm_count = np.fromiter((t.count("?") for t in texts), np.int64, len(texts))
+        qm = np.where(qm_count > 1, np.where(qm_count <= 3, qm_count * 0.18, 0.96), 0.0)
+        amp = excl + qm
+
+        sums = np.where(sums > 0, sums + amp, np.where(sums < 0, sums - amp, sums))
+        compound = np.clip(sums / np.sqrt(sums * sums + 15), -1.0, 1.0)
+        compound[lengths == 0] = 0.0
+
+        for i in np.flatnonzero(~fallback):
+            scores[i] = round(float(compound[i]), 4)
+        for i in np.flatnonzero(fallback):
+            scores[i] = self._reference(texts[i])
+        return scores
+
+    def _token_sums(self, ids, lengths):
+        a = self.vocab.arrays
+        n_docs = len(lengths)
+        n = len(ids)
+
+        doc = np.repeat(np.arange(n_docs), lengths)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        pos = np.arange(n) - starts[doc]
+        last = pos == lengths[doc] - 1
+
+        in_lex = a["in_lex"][ids]
+        lexv = a["valence"][ids]
+        booster = a["booster"][ids]
+        is_booster = a["is_booster"][ids]
+        upper = a["upper"][ids]
+        negation = a["negation"][ids]
+        code = a["code"][ids]
+        idiom = a["idiom"][ids]
+
+        def prev(arr, k, fill):
+            out = np.full_like(arr, fill)
+            out[k:] = arr[:-k]
+            return out
+
+        def nxt(arr, k, fill):
+            out = np.full_like(arr, fill)
+            out[:-k] = arr[k:]
+            return out
+
+        # Documents whose ALL CAPS words are a strict subset of their words.
+        n_upper = np.bincount(doc, weights=upper, minlength=n_docs)
+        cap_diff_doc = (lengths - n_upper > 0) & (lengths - n_upper < lengths)
+        cap_diff = cap_diff_doc[doc]
+
+        next_code = np.where(last, 0, nxt(code, 1, 0))
+        next_in_lex = ~last & nxt(in_lex, 1, False)
+
+        remaining = lengths[doc] - 1 - pos
+        near = {0: idiom}
+        for k in (1, 2, 3):
+            near[-k] = np.where(pos >= k, prev(idiom, k, 0), 0)
+            near[k] = np.where(remaining >= k, nxt(idiom, k, 0), 0)
+
+        def phrase_at(words, offsets):
+            hit = near[offsets[0]] == IDIOM_CODES[words[0]]
+            for w, off in zip(words[1:], offsets[1:]):
+                hit &= near[off] == IDIOM_CODES[w]
+            return hit
+
+        active = in_lex & ~is_booster & ~((code == KIND) & (next_code == OF))
+        v = np.where(active, lexv, 0.0)
+
+        v = np.where(active & (code == NO) & next_in_lex, 0.0, v)
+
+        c = [None] + [np.where(pos >= k, prev(code, k, 0), 0) for k in (1, 2, 3)]
+        no_before = (c[1] == NO) | (c[2] == NO) | ((c[3] == NO) & ((c[1] == OR) | (c[1] == NOR)))
+        v = np.where(active & no_before, lexv * vs.N_SCALAR, v)
+
+        caps = active & upper & cap_diff
+        v = np.where(caps, np.where(v > 0, v + vs.C_INCR, v - vs.C_INCR), v)
+
+        neg = [None] + [prev(negation, k, False) for k in (1, 2, 3)]
+        so_this = [None] + [(c[k] == SO) | (c[k] == THIS) for k in (1, 2, 3)]
+        damping = [1.0, 0.95, 0.9]
+
+        for k in (1, 2, 3):
+            valid = active & (pos >= k) & ~prev(in_lex, k, True)
+
+            s = np.where(v < 0, -1.0, 1.0) * prev(booster, k, 0.0)
+            cap_boost = prev(is_booster, k, False) & prev(upper, k, False) & cap_diff
+            s = np.where(cap_boost, np.where(v > 0, s + vs.C_INCR, s - vs.C_INCR), s)
+            v = np.where(valid, v + s * damping[k - 1], v)
+
+            if k == 1:
+                v = np.where(valid & neg[1], v * vs.N_SCALAR, v)
+            elif k == 2:
+                emphasis = (c[2] == NEVER) & so_this[1]
+                keep = (c[2] == WITHOUT) & (c[1] == DOUBT)
+                v = np.where(valid & emphasis, v * 1.25,
+                             np.where(valid & ~keep & neg[2], v * vs.N_SCALAR, v))
+            else:
+                emphasis = ((c[3] == NEVER) & so_this[2]) | so_this[1]
+                keep = (c[3] == WITHOUT) & ((c[2] == DOUBT) | (c[1] == DOUBT))
+                v = np.where(valid & emphasis, v * 1.25,
+                             np.where(valid & ~keep & neg[3], v * vs.N_SCALAR, v))
+
+                # Idioms replace the valence outright; the first matching
+                # sequence wins, then phrases starting at the word override it.
+                idiom_value = np.full(n, np.nan)
+                for offsets in IDIOM_SEQUENCES:
+                    for words, value in SPECIAL_PHRASES:
+                        if len(words) == len(offsets):
+                            idiom_value[np.isnan(idiom_value) & phrase_at(words, offsets)] = value
+                for offsets in IDIOM_OVERRIDES:
+                    for words, value in SPECIAL_PHRASES:
+                        if len(words) == len(offsets):
+                            idiom_value[phrase_at(words, offsets)] = value
+                v = np.where(valid & ~np.isnan(idiom_value), idiom_value, v)
+
+                for offsets in BOOSTER_SEQUENCES:
+                    for words, value in BOOSTER_PHRASES:
+                        if len(words) == len(offsets):
+                            v = np.where(valid & phrase_at(words, offsets), v + value, v)
+
+        least = active & (c[1] == LEAST) & ~prev(in_lex, 1, True)
+        v = np.where(least & (pos > 1) & (c[2] != AT) & (c[2] != VERY), v * vs.N_SCALAR, v)
+        v = np.where(least & (pos == 1), v * vs.N_SCALAR, v)
+
+        # "but": halve what comes before the first one and boost what follows.
+        is_but = code == BUT
+        first_but = np.full(n_docs, np.iinfo(np.int64).max)
+        np.minimum.at(first_but, doc[is_but], pos[is_but])
+        bi = first_but[doc]
+        has_but = bi < np.iinfo(np.int64).max
+        scaled = np.where(has_but & (pos < bi), v * 0.5, np.where(has_but & (pos > bi), v * 1.5, v))
+
+        # The reference applies the "but" rule through list.index(value), which
+        # finds the first equal value. That only differs from the positional
+        # rule above when an already scaled value equals a later unscaled one
+        # in the same review, so those reviews are scored exactly.
+        exact_docs = np.zeros(n_docs, dtype=bool)
+        nz = has_but & (v != 0)
+        if nz.any():
+            scaled_keys = pd.MultiIndex.from_arrays([doc[nz], scaled[nz]])
+            original_keys = pd.MultiIndex.from_arrays([doc[nz], v[nz]])
+            clash = original_keys.isin(scaled_keys)
+            exact_docs[doc[nz][clash]] = True
+
+        sums = np.bincount(doc, weights=scaled, minlength=n_docs)
+        return sums, exact_docs
+
+_scorer = None
+
+def score_batch(texts):
+    global _scorer
+    if _scorer is None:
+        _scorer = BatchSentimentScorer()
+    return _scorer.score(texts)
+
+def load_reviews(limit):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT review_text FROM reviews ORDER BY review_id LIMIT %s", (limit,))
+    texts = [row[0] for row in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return texts
+
+def check_parity(texts, batch_size=5000):
+    scorer = BatchSentimentScorer()
+    expected = np.array([scorer._reference(t) if t else 0.0 for t in texts])
+    actual = np.concatenate([scorer.score(texts[i:i + batch_size])
+                             for i in range(0, len(texts), batch_size)] or [np.zeros(0)])
+
+    diff = np.abs(actual - expected)
+    within = diff <= PARITY_TOLERANCE + 1e-12
+    print(f"Reviews compared: {len(texts):,}")
+    print(f"Max |difference|: {diff.max() if len(diff) else 0.0:.6f}")
+    print(f"Mean |difference|: {diff.mean() if len(diff) else 0.0:.8f}")
+    print(f"Within {PARITY_TOLERANCE}: {within.mean() if len(diff) else 1.0:.4%}")
+    return bool(within.all())
+
+def benchmark(texts, batch_size=5000):
+    scorer = BatchSentimentScorer()
+
+    start = time.perf_counter()
+    for t in texts:
+        if t:
+            scorer._reference(t)
+    reference_s = time.perf_counter() - start
+
+    # The warm-up batch fills the token vocabulary, which the timed run then
+    # reuses, as score_batch does with its shared scorer across calls.
+    scorer.score(texts[:batch_size])
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        scorer.score(texts[i:i + batch_size])
+    batch_s = time.perf_counter() - start
+
+    print(f"Reviews: {len(texts):,} (batch size {batch_size:,}, single core)")
+    print(f"vaderSentiment: {len(texts) / reference_s:,.0f} reviews/s")
+    print(f"Batch scorer:   {len(texts) / batch_s:,.0f} reviews/s")
+    print(f"Speedup: {reference_s / batch_s:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch VADER scorer parity check and benchmark")
+    parser.add_argument("--parity", action="store_true",
+                        help="compare against vaderSentiment on reviews from the database")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="measure throughput against vaderSentiment")
+    parser.add_argument("--limit", type=int, default=50000, help="number of reviews to use")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    texts = load_reviews(args.limit)
+    ok = True
+    if args.parity or not args.benchmark:
+        ok = check_parity(texts, args.batch_size)
+        print("Parity: " + ("PASS" if ok else "FAIL"))
+    if args.benchmark:
+        benchmark(texts, args.batch_size)
+    sys.exit(0 if ok else 1)
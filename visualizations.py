@@ -1,18 +1,25 @@
-import psycopg2
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+import snapshot
+from leaderboard import top_restaurants
+from storage import connect
+from typed_frames import SENTIMENT_SCHEMA, SERVICE_SCHEMA, TIP_SCHEMA, apply_schema, read_typed
+
+def load_frame(columns, query, schema):
+    df = snapshot.load_frame(columns=columns)
+    if df is not None:
+        return apply_schema(df, schema)
+
+    return read_typed(query, schema)
+
 def plot_tip_distribution():
-    conn = connect()
-    
     query = """
         SELECT predicted_tip_pct, tip_category
         FROM tip_predictions
     """
     
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = load_frame(["predicted_tip_pct", "tip_category"], query, TIP_SCHEMA)
     
     plt.figure(figsize=(12, 5))
     
@@ -40,8 +47,6 @@ def plot_tip_distribution():
     plt.close()
 
 def plot_sentiment_vs_tips():
-    conn = connect()
-    
     query = """
         SELECT 
             f.avg_sentiment,
@@ -51,8 +56,7 @@ def plot_sentiment_vs_tips():
         JOIN tip_predictions t ON f.restaurant_id = t.restaurant_id
     """
     
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = load_frame(["avg_sentiment", "predicted_tip_pct", "tip_category"], query, SENTIMENT_SCHEMA)
     
     plt.figure(figsize=(10, 6))
     
@@ -73,8 +77,6 @@ def plot_sentiment_vs_tips():
     plt.close()
 
 def plot_service_impact():
-    conn = connect()
-    
     query = """
         SELECT 
             f.service_mentions,
@@ -84,8 +86,8 @@ def plot_service_impact():
         WHERE f.service_mentions <= 20
     """
     
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = load_frame(["service_mentions", "predicted_tip_pct"], query, SERVICE_SCHEMA)
+    df = df[df['service_mentions'] <= 20]
     
     plt.figure(figsize=(10, 6))
     
@@ -101,21 +103,8 @@ def plot_service_impact():
     plt.close()
 
 def plot_top_restaurants():
-    conn = connect()
-    
-    query = """
-        SELECT 
-            r.name,
-            t.predicted_tip_pct
-        FROM restaurants r
-        JOIN tip_predictions t ON r.restaurant_id = t.restaurant_id
-        WHERE t.tip_category = 'high'
-        ORDER BY t.predicted_tip_pct DESC
-        LIMIT 10
-    """
-    
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = top_restaurants("category", "high", 10)
+    df['predicted_tip_pct'] = df['predicted_tip_pct'].astype(float)
     
     plt.figure(figsize=(10, 6))
     
@@ -181,14 +170,6 @@ def generate_summary_stats():
     cur.close()
     conn.close()
 
-def connect():
-    conn = psycopg2.connect(
-        dbname="restaurant_tips",
-        user="postgres",
-        password="your_password",
-        host="localhost"
-    )
-    return conn
 
 if __name__ == "__main__":
     print("\n")